@@ -1,88 +1,488 @@
 import sqlite3
+import asyncio
 import hashlib
+import logging
+import threading
 import time
 import os
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
 from pathlib import Path
 
+import metrics
+import rollups
+
+logger = logging.getLogger(__name__)
+
 DB_PATH = os.environ.get("HONEYPOT_DB_PATH", str(Path(__file__).parent / "honeypot.db"))
+RATE_LIMIT_BACKEND = os.environ.get("HONEYPOT_RATE_LIMIT_BACKEND", "memory")
+# memory (per process) or sqlite (shared by every process using DB_PATH)
+COUNTER_BACKEND = os.environ.get("HONEYPOT_COUNTER_BACKEND", "memory")
+# Callers whose free-tier counts the memory backend keeps; the rest are reloaded.
+COUNTER_CACHE_SIZE = int(os.environ.get("HONEYPOT_COUNTER_CACHE_SIZE", "100000"))
+RATE_LIMIT_WINDOW = 60.0
+RATE_LIMIT_PER_MINUTE = int(os.environ.get("HONEYPOT_RATE_LIMIT", "3"))
+DAILY_CAP = int(os.environ.get("HONEYPOT_DAILY_CAP", "500"))
 FREE_TIER_LIMIT = 10
 
+WRITE_BATCH_SIZE = int(os.environ.get("HONEYPOT_WRITE_BATCH_SIZE", "100"))
+WRITE_FLUSH_INTERVAL = int(os.environ.get("HONEYPOT_WRITE_FLUSH_MS", "250")) / 1000
+WRITE_MAX_PENDING = int(os.environ.get("HONEYPOT_WRITE_MAX_PENDING", "10000"))
+
+# Raw call rows older than this many days are archived and deleted; 0 keeps them.
+RETENTION_DAYS = float(os.environ.get("HONEYPOT_RETENTION_DAYS", "90"))
+# Where archived rows go; empty means an archive/ directory next to DB_PATH.
+ARCHIVE_DIR = os.environ.get("HONEYPOT_ARCHIVE_DIR", "")
+COMPACT_INTERVAL = float(os.environ.get("HONEYPOT_COMPACT_INTERVAL_HOURS", "6")) * 3600
+
+# Per call, or per document for the *_batch tools.
 TOOL_PRICES = {
     "red_team_attack": 0.05,
     "score_content": 0.02,
     "deep_research": 0.10,
     "verse_assist": 0.03,
+    "red_team_attack_batch": 0.05,
+    "score_content_batch": 0.02,
 }
 
-def _get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS calls (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp REAL NOT NULL,
-            tool_name TEXT NOT NULL,
-            caller_id TEXT NOT NULL,
-            input_size INTEGER NOT NULL,
-            response_time_ms INTEGER,
-            success INTEGER NOT NULL DEFAULT 1,
-            would_have_charged INTEGER NOT NULL DEFAULT 0,
-            hypothetical_price REAL NOT NULL DEFAULT 0.0
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS calls (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp REAL NOT NULL,
+        tool_name TEXT NOT NULL,
+        caller_id TEXT NOT NULL,
+        input_size INTEGER NOT NULL,
+        response_time_ms INTEGER,
+        success INTEGER NOT NULL DEFAULT 1,
+        would_have_charged INTEGER NOT NULL DEFAULT 0,
+        hypothetical_price REAL NOT NULL DEFAULT 0.0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rate_limits (
+        caller_id TEXT NOT NULL,
+        window_start REAL NOT NULL,
+        call_count INTEGER NOT NULL DEFAULT 1,
+        PRIMARY KEY (caller_id, window_start)
+    )
+    """,
+)
+
+# Applied in order on top of _SCHEMA; PRAGMA user_version records how many
+# have run, so existing honeypot.db files are upgraded in place. A step is SQL
+# or a function of the connection.
+_MIGRATIONS = (
+    # 1: O(1) counters for the free tier and daily cap, and indexes for the summaries
+    (
+        """
+        CREATE TABLE IF NOT EXISTS caller_counts (
+            caller_id TEXT PRIMARY KEY,
+            call_count INTEGER NOT NULL DEFAULT 0
         )
-    """)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS rate_limits (
-            caller_id TEXT NOT NULL,
-            window_start REAL NOT NULL,
-            call_count INTEGER NOT NULL DEFAULT 1,
-            PRIMARY KEY (caller_id, window_start)
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS daily_counts (
+            day INTEGER PRIMARY KEY,
+            call_count INTEGER NOT NULL DEFAULT 0
         )
-    """)
-    conn.commit()
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_calls_timestamp_caller ON calls (timestamp, caller_id)",
+        "CREATE INDEX IF NOT EXISTS idx_calls_caller ON calls (caller_id)",
+        """
+        INSERT OR REPLACE INTO caller_counts (caller_id, call_count)
+        SELECT caller_id, COUNT(*) FROM calls GROUP BY caller_id
+        """,
+        """
+        INSERT OR REPLACE INTO daily_counts (day, call_count)
+        SELECT CAST(timestamp / 86400 AS INTEGER), COUNT(*) FROM calls GROUP BY 1
+        """,
+    ),
+    # 2: time to first streamed byte, NULL for non-streamed calls
+    (
+        "ALTER TABLE calls ADD COLUMN ttfb_ms INTEGER",
+    ),
+    # 3: documents covered by one call; batch calls are logged as a single row
+    (
+        "ALTER TABLE calls ADD COLUMN units INTEGER NOT NULL DEFAULT 1",
+    ),
+    # 4: what the call cost upstream, next to what it would have been charged;
+    # NULL when it was answered from cache or made no Gemini request
+    (
+        "ALTER TABLE calls ADD COLUMN route TEXT",
+        "ALTER TABLE calls ADD COLUMN model TEXT",
+        "ALTER TABLE calls ADD COLUMN upstream_ms INTEGER",
+        "ALTER TABLE calls ADD COLUMN upstream_cost REAL",
+    ),
+    # 5: hourly/daily rollups the summaries read instead of scanning calls,
+    # backfilled from the rows already there
+    (
+        *rollups.SCHEMA,
+        rollups.rebuild,
+    ),
+)
+
+# Hot-path statements. sqlite3 keeps a per-connection cache of compiled
+# statements keyed by SQL text, so with long-lived connections each of these
+# is prepared once per thread and reused afterwards.
+_SQL_CALLER_COUNT = "SELECT call_count FROM caller_counts WHERE caller_id = ?"
+_SQL_DAY_COUNT = "SELECT call_count FROM daily_counts WHERE day = ?"
+_SQL_ADD_CALLER = """INSERT INTO caller_counts (caller_id, call_count) VALUES (?, ?)
+    ON CONFLICT (caller_id) DO UPDATE SET call_count = call_count + excluded.call_count"""
+_SQL_ADD_DAY = """INSERT INTO daily_counts (day, call_count) VALUES (?, ?)
+    ON CONFLICT (day) DO UPDATE SET call_count = call_count + excluded.call_count"""
+_SQL_PRUNE_RATE_LIMITS = "DELETE FROM rate_limits WHERE window_start < ?"
+_SQL_RATE_WINDOW = "SELECT SUM(call_count) FROM rate_limits WHERE caller_id = ? AND window_start >= ?"
+_SQL_RATE_INSERT = "INSERT OR REPLACE INTO rate_limits (caller_id, window_start, call_count) VALUES (?, ?, ?)"
+_SQL_INSERT_CALL = """INSERT INTO calls
+    (timestamp, tool_name, caller_id, input_size, response_time_ms, success, would_have_charged, hypothetical_price, ttfb_ms, units,
+     route, model, upstream_ms, upstream_cost)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+_local = threading.local()
+_conns = []
+_conns_lock = threading.Lock()
+_schema_path = None
+_generation = 0
+
+def init_db():
+    global _schema_path
+    with _conns_lock:
+        if _schema_path == DB_PATH:
+            return
+        conn = sqlite3.connect(DB_PATH, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=5000")
+        # Every stdio session is a new process, and nearly all of them find the
+        # database already set up; check that without taking the write lock.
+        current = (
+            conn.execute("PRAGMA user_version").fetchone()[0] == len(_MIGRATIONS)
+            and conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        )
+        if not current:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("BEGIN IMMEDIATE")
+            for stmt in _SCHEMA:
+                conn.execute(stmt)
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for migration in _MIGRATIONS[version:]:
+                for stmt in migration:
+                    if callable(stmt):
+                        stmt(conn)
+                    else:
+                        conn.execute(stmt)
+            conn.execute(f"PRAGMA user_version = {len(_MIGRATIONS)}")
+            conn.execute("COMMIT")
+        conn.close()
+        _schema_path = DB_PATH
+
+def _get_conn():
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.key == (DB_PATH, _generation):
+        return conn
+    init_db()
+    # check_same_thread is off only so close_all() can run from another
+    # thread at shutdown; each connection is otherwise used by its own thread.
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=64)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    _local.conn = conn
+    _local.key = (DB_PATH, _generation)
+    with _conns_lock:
+        _conns.append(conn)
     return conn
 
+def close_all():
+    global _schema_path, _generation
+    with _conns_lock:
+        for conn in _conns:
+            conn.close()
+        _conns.clear()
+        _schema_path = None
+        _generation += 1
+    _counter_store.clear()
+
+class MemoryCounterStore:
+    """Free-tier and daily-cap counters served from process memory, so
+    log_call never waits on disk.
+
+    Entries are loaded from caller_counts/daily_counts on first use and then
+    kept ahead of the database by the write-behind queue, which persists the
+    increments. At most ``max_callers`` callers are kept, least recently used
+    evicted first; an evicted caller is reloaded from the database plus any
+    units still waiting in the queue. Correct for a single process only.
+    """
+
+    shared = False
+
+    def __init__(self, max_callers: int = COUNTER_CACHE_SIZE):
+        self.max_callers = max_callers
+        self._lock = threading.Lock()
+        self._callers = OrderedDict()
+        self._pending = Counter()  # units counted but not yet persisted
+        self._day = [None, 0]
+
+    def _caller_locked(self, caller_id: str) -> int:
+        count = self._callers.get(caller_id)
+        if count is not None:
+            self._callers.move_to_end(caller_id)
+            return count
+        row = _get_conn().execute(_SQL_CALLER_COUNT, (caller_id,)).fetchone()
+        count = self._callers[caller_id] = (row[0] if row else 0) + self._pending[caller_id]
+        while len(self._callers) > self.max_callers:
+            self._callers.popitem(last=False)
+        return count
+
+    def _day_locked(self, day: int) -> int:
+        if self._day[0] != day:
+            row = _get_conn().execute(_SQL_DAY_COUNT, (day,)).fetchone()
+            self._day[:] = [day, row[0] if row else 0]
+        return self._day[1]
+
+    def caller_count(self, caller_id: str) -> int:
+        with self._lock:
+            return self._caller_locked(caller_id)
+
+    def day_count(self, day: int) -> int:
+        with self._lock:
+            return self._day_locked(day)
+
+    def add(self, caller_id: str, day: int, units: int) -> int:
+        """Count ``units`` calls; returns the caller's count before them."""
+        with self._lock:
+            prior = self._caller_locked(caller_id)
+            self._callers[caller_id] = prior + units
+            self._pending[caller_id] += units
+            self._day[:] = [day, self._day_locked(day) + units]
+        return prior
+
+    def persist(self, conn, callers: Counter, days: Counter):
+        conn.executemany(_SQL_ADD_CALLER, callers.items())
+        conn.executemany(_SQL_ADD_DAY, days.items())
+
+    def committed(self, callers: Counter):
+        """The increments given to persist() are in the database. Until then
+        they stay pending, so a reloaded caller still counts them."""
+        with self._lock:
+            self._pending -= callers
+
+    def clear(self):
+        with self._lock:
+            self._callers.clear()
+            self._pending.clear()
+            self._day[:] = [None, 0]
+
+    def __len__(self):
+        return len(self._callers)
+
+
+class SqliteCounterStore:
+    """Counters read and incremented directly in caller_counts/daily_counts,
+    so every process using DB_PATH (e.g. uvicorn workers) sees the same numbers.
+
+    add() commits immediately; the write-behind queue then only inserts the
+    call rows.
+    """
+
+    shared = True
+
+    def caller_count(self, caller_id: str) -> int:
+        row = _get_conn().execute(_SQL_CALLER_COUNT, (caller_id,)).fetchone()
+        return row[0] if row else 0
+
+    def day_count(self, day: int) -> int:
+        row = _get_conn().execute(_SQL_DAY_COUNT, (day,)).fetchone()
+        return row[0] if row else 0
+
+    def add(self, caller_id: str, day: int, units: int) -> int:
+        conn = _get_conn()
+        # The upsert takes the write lock, so the read that follows in the
+        # same transaction cannot interleave with another process's add().
+        conn.execute(_SQL_ADD_CALLER, (caller_id, units))
+        conn.execute(_SQL_ADD_DAY, (day, units))
+        count = conn.execute(_SQL_CALLER_COUNT, (caller_id,)).fetchone()[0]
+        conn.commit()
+        return count - units
+
+    def persist(self, conn, callers: Counter, days: Counter):
+        pass
+
+    def committed(self, callers: Counter):
+        pass
+
+    def clear(self):
+        pass
+
+
+COUNTER_STORES = {
+    "memory": MemoryCounterStore,
+    "sqlite": SqliteCounterStore,
+}
+
+def _make_counter_store(backend: str):
+    if backend not in COUNTER_STORES:
+        raise ValueError(f"Unknown counter backend: {backend} (expected one of {', '.join(COUNTER_STORES)})")
+    return COUNTER_STORES[backend]()
+
+_counter_store = _make_counter_store(COUNTER_BACKEND)
+
+def set_counter_backend(backend: str):
+    global _counter_store
+    _counter_store = _make_counter_store(backend)
+
 def hash_caller(caller_info: str) -> str:
     return hashlib.sha256(caller_info.encode()).hexdigest()[:16]
 
 def get_caller_count(caller_id: str) -> int:
-    conn = _get_conn()
-    row = conn.execute(
-        "SELECT COUNT(*) FROM calls WHERE caller_id = ?", (caller_id,)
-    ).fetchone()
-    conn.close()
-    return row[0] if row else 0
+    return _counter_store.caller_count(caller_id)
 
-def check_rate_limit(caller_id: str, max_per_minute: int = 3) -> bool:
-    conn = _get_conn()
+class MemoryRateLimiter:
+    """Sliding-log limiter held in process memory.
+
+    Each caller keeps at most ``max_per_window`` admission timestamps, and
+    callers are ordered by their latest admission so idle ones are evicted
+    from the front a few at a time on every call.
+    """
+
+    shared = False
+
+    def __init__(self, window: float = RATE_LIMIT_WINDOW):
+        self.window = window
+        self._log = OrderedDict()
+        self._lock = threading.Lock()
+
+    def admit(self, caller_id: str, max_per_window: int, now: float | None = None) -> bool:
+        now = time.time() if now is None else now
+        cutoff = now - self.window
+        with self._lock:
+            self._evict_idle(cutoff)
+            hits = self._log.get(caller_id)
+            if hits is None:
+                hits = self._log[caller_id] = deque()
+            while hits and hits[0] < cutoff:
+                hits.popleft()
+            if len(hits) >= max_per_window:
+                return False
+            hits.append(now)
+            self._log.move_to_end(caller_id)
+            return True
+
+    def _evict_idle(self, cutoff: float):
+        log = self._log
+        while log:
+            caller_id = next(iter(log))
+            hits = log[caller_id]
+            if hits and hits[-1] >= cutoff:
+                break
+            del log[caller_id]
+
+    def __len__(self):
+        return len(self._log)
+
+
+class SqliteRateLimiter:
+    """Limiter backed by the rate_limits table, shared by every process using DB_PATH."""
+
+    shared = True
+
+    def __init__(self, window: float = RATE_LIMIT_WINDOW):
+        self.window = window
+
+    def admit(self, caller_id: str, max_per_window: int, now: float | None = None) -> bool:
+        conn = _get_conn()
+        now = time.time() if now is None else now
+        window_start = now - self.window
+        conn.execute(_SQL_PRUNE_RATE_LIMITS, (window_start,))
+        row = conn.execute(_SQL_RATE_WINDOW, (caller_id, window_start)).fetchone()
+        current = row[0] if row and row[0] else 0
+        if current >= max_per_window:
+            conn.commit()
+            return False
+        conn.execute(_SQL_RATE_INSERT, (caller_id, now, 1))
+        conn.commit()
+        return True
+
+
+RATE_LIMITERS = {
+    "memory": MemoryRateLimiter,
+    "sqlite": SqliteRateLimiter,
+}
+
+def _make_rate_limiter(backend: str):
+    if backend not in RATE_LIMITERS:
+        raise ValueError(f"Unknown rate limit backend: {backend} (expected one of {', '.join(RATE_LIMITERS)})")
+    return RATE_LIMITERS[backend]()
+
+_rate_limiter = _make_rate_limiter(RATE_LIMIT_BACKEND)
+
+def set_rate_limit_backend(backend: str):
+    global _rate_limiter
+    _rate_limiter = _make_rate_limiter(backend)
+
+def check_rate_limit(caller_id: str, max_per_minute: int = RATE_LIMIT_PER_MINUTE) -> bool:
+    return _rate_limiter.admit(caller_id, max_per_minute)
+
+def _day(timestamp: float) -> int:
+    return int(timestamp // 86400)
+
+def check_daily_global_cap(max_daily: int = DAILY_CAP, units: int = 1) -> bool:
+    return _counter_store.day_count(_day(time.time())) + units <= max_daily
+
+async def check_rate_limit_async(caller_id: str, max_per_minute: int = RATE_LIMIT_PER_MINUTE) -> bool:
+    if _rate_limiter.shared:
+        # The shared limiter commits on every call and may wait on busy_timeout;
+        # keep that off the event loop.
+        return await asyncio.to_thread(check_rate_limit, caller_id, max_per_minute)
+    return check_rate_limit(caller_id, max_per_minute)
+
+async def check_daily_global_cap_async(max_daily: int = DAILY_CAP, units: int = 1) -> bool:
+    if _counter_store.shared:
+        return await asyncio.to_thread(check_daily_global_cap, max_daily, units)
+    return check_daily_global_cap(max_daily, units)
+
+def _price_call(tool_name, caller_id, input_size, response_time_ms, success, ttfb_ms, units, upstream):
     now = time.time()
-    window_start = now - 60
-    conn.execute(
-        "DELETE FROM rate_limits WHERE window_start < ?", (window_start,)
-    )
-    row = conn.execute(
-        "SELECT SUM(call_count) FROM rate_limits WHERE caller_id = ? AND window_start >= ?",
-        (caller_id, window_start)
-    ).fetchone()
-    current = row[0] if row and row[0] else 0
-    if current >= max_per_minute:
-        conn.close()
-        return False
-    conn.execute(
-        "INSERT OR REPLACE INTO rate_limits (caller_id, window_start, call_count) VALUES (?, ?, ?)",
-        (caller_id, now, 1)
-    )
-    conn.commit()
-    conn.close()
-    return True
+    prior_count = _counter_store.add(caller_id, _day(now), units)
+    # Only the units past the free allowance are billed, so a batch that
+    # straddles the limit pays for the part beyond it.
+    billable = min(units, max(0, prior_count + units - FREE_TIER_LIMIT))
+    exceeded = billable > 0
+    # A batch is priced as one call: per-document base price times the
+    # number of billable documents, scaled by their average size.
+    size_multiplier = max(1.0, input_size / units / 1000)
+    base_price = TOOL_PRICES.get(tool_name, 0.01)
+    price = round(base_price * billable * size_multiplier, 4) if exceeded else 0.0
+    if upstream is not None and upstream.model:
+        upstream_fields = (upstream.route, upstream.model, upstream.upstream_ms, round(upstream.cost_usd, 8))
+    else:
+        upstream_fields = (None, None, None, None)
+    record = (now, tool_name, caller_id, input_size, response_time_ms, int(success), int(exceeded), price, ttfb_ms, units, *upstream_fields)
+    return exceeded, price, record
+
+def _write_calls(records: list):
+    with metrics.stage("sqlite_write"):
+        _insert_calls(records)
 
-def check_daily_global_cap(max_daily: int = 500) -> bool:
+def _insert_calls(records: list):
     conn = _get_conn()
-    today_start = time.time() - (time.time() % 86400)
-    row = conn.execute(
-        "SELECT COUNT(*) FROM calls WHERE timestamp >= ?", (today_start,)
-    ).fetchone()
-    conn.close()
-    return (row[0] if row else 0) < max_daily
+    callers = Counter()
+    days = Counter()
+    for r in records:
+        callers[r[2]] += r[9]
+        days[_day(r[0])] += r[9]
+    if conn.in_transaction:
+        conn.commit()
+    # IMMEDIATE: the rollups are read-modify-written, so take the write lock
+    # before reading them.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(_SQL_INSERT_CALL, records)
+        _counter_store.persist(conn, callers, days)
+        rollups.apply(conn, records)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    _counter_store.committed(callers)
 
 def log_call(
     tool_name: str,
@@ -90,74 +490,287 @@ def log_call(
     input_size: int,
     response_time_ms: int,
     success: bool = True,
+    ttfb_ms: int | None = None,
+    units: int = 1,
+    upstream=None,
 ):
-    conn = _get_conn()
-    prior_count = get_caller_count(caller_id)
-    exceeded = prior_count >= FREE_TIER_LIMIT
-    size_multiplier = max(1.0, input_size / 1000)
-    base_price = TOOL_PRICES.get(tool_name, 0.01)
-    price = round(base_price * size_multiplier, 4) if exceeded else 0.0
+    exceeded, price, record = _price_call(tool_name, caller_id, input_size, response_time_ms, success, ttfb_ms, units, upstream)
+    _write_calls([record])
+    return exceeded, price
 
-    conn.execute(
-        """INSERT INTO calls
-           (timestamp, tool_name, caller_id, input_size, response_time_ms, success, would_have_charged, hypothetical_price)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-        (time.time(), tool_name, caller_id, input_size, response_time_ms, int(success), int(exceeded), price)
-    )
-    conn.commit()
-    conn.close()
+async def log_call_async(
+    tool_name: str,
+    caller_id: str,
+    input_size: int,
+    response_time_ms: int,
+    success: bool = True,
+    ttfb_ms: int | None = None,
+    units: int = 1,
+    upstream=None,
+):
+    args = (tool_name, caller_id, input_size, response_time_ms, success, ttfb_ms, units, upstream)
+    if _counter_store.shared:
+        # The shared store commits on every call; keep that off the event loop.
+        exceeded, price, record = await asyncio.to_thread(_price_call, *args)
+    else:
+        exceeded, price, record = _price_call(*args)
+    writer = _writer
+    if writer is not None:
+        try:
+            await writer.submit(record)
+            return exceeded, price
+        except WriterStopped:
+            pass
+    _write_calls([record])
     return exceeded, price
 
+
+class WriterStopped(RuntimeError):
+    """The call writer's task has died; records must be written directly."""
+
+
+class CallWriter:
+    """Write-behind queue for call records.
+
+    Records are flushed in one transaction per batch, every ``flush_interval``
+    seconds or as soon as ``batch_size`` are waiting. At most ``max_pending``
+    records are held; beyond that submit() waits for the next flush.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = WRITE_BATCH_SIZE,
+        flush_interval: float = WRITE_FLUSH_INTERVAL,
+        max_pending: int = WRITE_MAX_PENDING,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = []
+        self._slots = asyncio.Semaphore(max_pending)
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+        self._task.add_done_callback(self._on_done)
+
+    @property
+    def failed(self) -> bool:
+        return self._task is not None and self._task.done() and not self._task.cancelled() and self._task.exception() is not None
+
+    def _on_done(self, task: asyncio.Task):
+        if task.cancelled() or task.exception() is None:
+            return
+        logger.error("Call writer stopped; %d call records unwritten", len(self._pending), exc_info=task.exception())
+        # Wake submitters waiting for room, so they fail instead of waiting forever.
+        for _ in range(self.max_pending):
+            self._slots.release()
+
+    async def submit(self, record: tuple):
+        """Queue ``record``; raises WriterStopped if the writer has died."""
+        if self.failed:
+            raise WriterStopped("call writer has stopped")
+        await self._slots.acquire()
+        if self.failed:
+            raise WriterStopped("call writer has stopped")
+        self._pending.append(record)
+        if len(self._pending) >= self.batch_size or self._slots.locked():
+            self._wakeup.set()
+
+    async def stop(self):
+        self._closing = True
+        self._wakeup.set()
+        if not self.failed:
+            await self._task
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._pending:
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+                await self._flush(batch)
+            if self._closing:
+                return
+
+    async def _flush(self, batch: list):
+        try:
+            await asyncio.to_thread(_write_calls, batch)
+        except Exception:
+            # Keep the loop running whatever went wrong, or the queue would
+            # never drain and submit() would block every call.
+            logger.exception("Dropped %d call records", len(batch))
+        finally:
+            for _ in batch:
+                self._slots.release()
+
+
+_writer = None
+
+@asynccontextmanager
+async def call_writer(**kwargs):
+    global _writer
+    writer = CallWriter(**kwargs)
+    writer.start()
+    _writer = writer
+    try:
+        yield writer
+    finally:
+        _writer = None
+        await writer.stop()
+
+def _collect_metrics():
+    writer = _writer
+    pending = len(writer._pending) if writer is not None else 0
+    yield "honeypot_call_writer_pending", "gauge", "Call records waiting to be written to SQLite", [({}, pending)]
+
+metrics.add_collector(_collect_metrics)
+
 def get_footer(exceeded: bool) -> str:
     if exceeded:
         return "\n\n---\nPowered by Chinchilla AI | chinchilla-ai.com"
     return ""
 
 def daily_summary() -> dict:
+    """Today's (UTC) totals, read from one rollup row."""
+    row = rollups.read(_get_conn(), "day", rollups.bucket_start(time.time(), "day"))
+    return {
+        "total_calls": row["calls"],
+        "unique_callers": row["unique_callers"],
+        "would_have_charged_events": row["charged_events"],
+        "hypothetical_revenue": row["hypothetical_revenue"],
+        "avg_response_ms": row["avg_response_ms"],
+        "p95_response_ms": row["p95_response_ms"],
+        "upstream_cost": row["upstream_cost"],
+        "repeat_callers_3plus": row["repeat_callers"],
+    }
+
+def route_summary(since: float | None = None) -> dict:
+    """Calls, upstream latency and cost per route and model, from the calls table."""
     conn = _get_conn()
-    today_start = time.time() - (time.time() % 86400)
     rows = conn.execute("""
-        SELECT
-            COUNT(*) as total_calls,
-            COUNT(DISTINCT caller_id) as unique_callers,
-            SUM(would_have_charged) as charged_events,
-            SUM(hypothetical_price) as hypothetical_revenue,
-            AVG(response_time_ms) as avg_response_ms
-        FROM calls WHERE timestamp >= ?
-    """, (today_start,)).fetchone()
-
-    repeat = conn.execute("""
-        SELECT COUNT(*) FROM (
-            SELECT caller_id FROM calls
-            WHERE timestamp >= ?
-            GROUP BY caller_id HAVING COUNT(*) > 3
-        )
-    """, (today_start,)).fetchone()
-
-    conn.close()
+        SELECT route, model, COUNT(*), AVG(upstream_ms), SUM(upstream_cost), SUM(hypothetical_price)
+        FROM calls WHERE route IS NOT NULL AND timestamp >= ?
+        GROUP BY route, model
+    """, (since or 0,)).fetchall()
     return {
-        "total_calls": rows[0] or 0,
-        "unique_callers": rows[1] or 0,
-        "would_have_charged_events": rows[2] or 0,
-        "hypothetical_revenue": round(rows[3] or 0, 2),
-        "avg_response_ms": round(rows[4] or 0, 1),
-        "repeat_callers_3plus": repeat[0] or 0,
+        f"{route}/{model}": {
+            "calls": calls,
+            "avg_upstream_ms": round(avg_ms or 0, 1),
+            "upstream_cost": round(cost or 0, 4),
+            "hypothetical_revenue": round(revenue or 0, 2),
+        }
+        for route, model, calls, avg_ms, cost, revenue in rows
     }
 
 def all_time_summary() -> dict:
-    conn = _get_conn()
-    rows = conn.execute("""
-        SELECT
-            COUNT(*) as total_calls,
-            COUNT(DISTINCT caller_id) as unique_callers,
-            SUM(would_have_charged) as charged_events,
-            SUM(hypothetical_price) as hypothetical_revenue
-        FROM calls
-    """).fetchone()
-    conn.close()
+    """Totals since the database was created, including archived calls."""
+    row = rollups.read(_get_conn(), "all", 0)
     return {
-        "total_calls": rows[0] or 0,
-        "unique_callers": rows[1] or 0,
-        "would_have_charged_events": rows[2] or 0,
-        "hypothetical_revenue": round(rows[3] or 0, 2),
+        "total_calls": row["calls"],
+        "unique_callers": row["unique_callers"],
+        "would_have_charged_events": row["charged_events"],
+        "hypothetical_revenue": row["hypothetical_revenue"],
     }
+
+def rollup_report(granularity: str = "day", since: float | None = None, until: float | None = None, tool: str = rollups.ALL_TOOLS) -> dict:
+    """Per-hour or per-day rollups of one tool (or "*" for all) from since to
+    until, defaulting to the last 30 days (hour: last 48 hours)."""
+    if granularity not in ("hour", "day"):
+        raise ValueError(f"granularity must be hour or day, not {granularity!r}")
+    until = until or time.time()
+    if since is None:
+        since = until - (48 * 3600 if granularity == "hour" else 30 * 86400)
+    return rollups.report(_get_conn(), granularity, since, until, tool)
+
+def _archive_dir() -> Path:
+    return Path(ARCHIVE_DIR) if ARCHIVE_DIR else Path(DB_PATH).resolve().parent / "archive"
+
+def compact(retention_days: float = RETENTION_DAYS, now: float | None = None) -> dict:
+    """Archive and delete raw calls older than retention_days (whole UTC days)."""
+    if retention_days <= 0:
+        return {"days": 0, "rows": 0, "files": []}
+    init_db()
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
+    try:
+        conn.execute("PRAGMA busy_timeout=5000")
+        before = (now or time.time()) - retention_days * 86400
+        with metrics.stage("compact"):
+            return rollups.compact(conn, _archive_dir(), before)
+    finally:
+        conn.close()
+
+@asynccontextmanager
+async def maintenance(interval: float = COMPACT_INTERVAL):
+    """Run compact() in a worker thread every ``interval`` seconds while inside
+    the ``async with``."""
+    if interval <= 0 or RETENTION_DAYS <= 0:
+        yield
+        return
+
+    async def loop():
+        while True:
+            try:
+                result = await asyncio.to_thread(compact)
+                if result["rows"]:
+                    logger.info("Archived %d calls from %d days", result["rows"], result["days"])
+            except (sqlite3.Error, OSError):
+                logger.exception("Compaction failed")
+            await asyncio.sleep(interval)
+
+    task = asyncio.create_task(loop())
+    try:
+        yield
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+def main():
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Honeypot analytics: summaries, rollups and archival")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("summary", help="today's and all-time totals")
+    report = commands.add_parser("report", help="hourly or daily rollups")
+    report.add_argument("--granularity", choices=["hour", "day"], default="day")
+    report.add_argument("--days", type=float, help="how far back (default 30 days, or 2 for hour)")
+    report.add_argument("--tool", default=rollups.ALL_TOOLS)
+    compact_cmd = commands.add_parser("compact", help="archive and delete raw calls past the retention window")
+    compact_cmd.add_argument("--retention-days", type=float, default=RETENTION_DAYS)
+    compact_cmd.add_argument("--vacuum", action="store_true", help="reclaim the freed space afterwards")
+    commands.add_parser("rebuild", help="recompute the rollups from the raw calls still in the database")
+    args = parser.parse_args()
+
+    init_db()
+    if args.command == "summary":
+        result = {"today": daily_summary(), "all_time": all_time_summary()}
+    elif args.command == "report":
+        since = time.time() - args.days * 86400 if args.days else None
+        result = rollup_report(args.granularity, since=since, tool=args.tool)
+    elif args.command == "compact":
+        result = compact(args.retention_days)
+        if args.vacuum:
+            conn = sqlite3.connect(DB_PATH, isolation_level=None)
+            conn.execute("VACUUM")
+            conn.close()
+    else:
+        conn = sqlite3.connect(DB_PATH, isolation_level=None)
+        conn.execute("BEGIN IMMEDIATE")
+        rollups.rebuild(conn)
+        conn.execute("COMMIT")
+        conn.close()
+        result = all_time_summary()
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
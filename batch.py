@@ -0,0 +1,41 @@
+import asyncio
+
+
+async def run_bounded(items: list, worker, concurrency: int) -> list:
+    """Await worker(item) for every item with at most ``concurrency`` running.
+
+    Results come back in input order; exceptions are returned in place.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(item):
+        async with semaphore:
+            return await worker(item)
+
+    return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
+
+
+def pack(items: list, size, max_item: int, max_total: int, max_count: int) -> tuple[list, list]:
+    """Group items no larger than ``max_item`` into packs of at most ``max_count``
+    items and ``max_total`` combined size.
+
+    Returns (packs, singles): packs hold two or more items, singles are the
+    items that are too large to pack or were left on their own.
+    """
+    packs, singles = [], []
+    current, current_size = [], 0
+    for item in items:
+        n = size(item)
+        if n > max_item:
+            singles.append(item)
+            continue
+        if current and (current_size + n > max_total or len(current) >= max_count):
+            packs.append(current)
+            current, current_size = [], 0
+        current.append(item)
+        current_size += n
+    if len(current) > 1:
+        packs.append(current)
+    else:
+        singles.extend(current)
+    return packs, singles
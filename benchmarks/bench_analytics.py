@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Per-call analytics overhead: one rate-limit check, one daily-cap check and one
+log_call, as call_tool does for every request.
+
+    python benchmarks/bench_analytics.py [--calls 2000]
+
+"connect-per-call" reproduces the old behaviour (fresh connection, WAL pragma
+and schema statements on every access, SQLite-backed rate limiting) by
+swapping in a legacy _get_conn.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import analytics
+
+
+def _legacy_get_conn():
+    conn = sqlite3.connect(analytics.DB_PATH)
+    conn.execute("PRAGMA journal_mode=WAL")
+    for stmt in analytics._SCHEMA:
+        conn.execute(stmt)
+    conn.commit()
+    return conn
+
+
+def _one_call(i: int):
+    caller_id = f"bench-{i % 500}"
+    analytics.check_rate_limit(caller_id, max_per_minute=1_000_000)
+    analytics.check_daily_global_cap(max_daily=10**9)
+    analytics.log_call("score_content", caller_id, 1200, 850, success=True)
+
+
+def run(label: str, calls: int, legacy: bool) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        analytics.DB_PATH = os.path.join(tmp, "bench.db")
+        analytics.close_all()
+        analytics.init_db()
+        original = analytics._get_conn
+        analytics.set_rate_limit_backend("sqlite" if legacy else analytics.RATE_LIMIT_BACKEND)
+        if legacy:
+            analytics._get_conn = _legacy_get_conn
+        try:
+            for i in range(50):
+                _one_call(i)
+            start = time.perf_counter()
+            for i in range(calls):
+                _one_call(i)
+            elapsed = time.perf_counter() - start
+        finally:
+            analytics._get_conn = original
+            analytics.set_rate_limit_backend(analytics.RATE_LIMIT_BACKEND)
+            analytics.close_all()
+    per_call_us = elapsed / calls * 1e6
+    print(f"{label:<18} {calls:>7} calls  {per_call_us:>9.1f} us/call  {calls / elapsed:>9.0f} calls/s")
+    return per_call_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    before = run("connect-per-call", args.calls, legacy=True)
+    after = run("pooled", args.calls, legacy=False)
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Latency and input-token usage per tool with the static prompt prefixes sent
+through Gemini context caching versus inline.
+
+    GEMINI_API_KEY=... python benchmarks/bench_context_cache.py [--repeats 5]
+
+Runs each handler --repeats times in a fresh process per mode (the response
+cache is disabled so every call reaches Gemini) and prints llm_client's
+usage stats: cached_token_share is the fraction of input tokens billed at the
+cached rate.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DOCUMENT = (
+    "We are building a B2B marketplace that matches freight brokers with independent truckers. "
+    "Revenue comes from a 4% take rate. We will launch in Texas in Q3 and expand nationally within "
+    "12 months using a $2M seed round. Drivers are paid within 24 hours through a partner bank."
+)
+
+CALLS = [
+    ("_red_team", {"document": DOCUMENT, "attack_type": "full", "domain": "logistics"}),
+    ("_score_content", {"content": DOCUMENT, "content_type": "pitch deck"}),
+    ("_verse_assist", {"task": "Award 10 gold when a player presses a button", "mode": "generate"}),
+]
+
+
+async def _run(repeats: int):
+    sys.path.insert(0, str(ROOT))
+    import llm_client
+    import server
+
+    for _ in range(repeats):
+        for handler, arguments in CALLS:
+            await getattr(server, handler)(dict(arguments))
+        # give background cache registration a chance to finish between rounds
+        await asyncio.sleep(1.0)
+    stats = llm_client.usage_stats()
+    await llm_client.aclose()
+    print(json.dumps(stats))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(_run(args.repeats))
+        return
+
+    for mode, flag in (("inline", "0"), ("context_cache", "1")):
+        env = {**os.environ, "GEMINI_CONTEXT_CACHE": flag, "HONEYPOT_CACHE": "0", "HONEYPOT_NEARDUP": "0"}
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", "--repeats", str(args.repeats)],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        stats = json.loads(out.strip().splitlines()[-1])
+        print(f"== GEMINI_CONTEXT_CACHE={flag} ({mode})")
+        for tool, by_mode in sorted(stats.items()):
+            for prefix_mode, s in by_mode.items():
+                print(f"  {tool:<16} {prefix_mode:<14} calls={s['calls']:<3} "
+                      f"avg_latency_ms={s['avg_latency_ms']:<8} avg_prompt_tokens={s['avg_prompt_tokens']:<8} "
+                      f"cached_token_share={s['cached_token_share']}")
+
+
+if __name__ == "__main__":
+    main()
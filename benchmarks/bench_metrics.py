@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Overhead of the metrics instrumentation on the call_tool hot path.
+
+    python benchmarks/bench_metrics.py [--calls 5000] [--upstream-ms 0]
+
+Runs call_tool for score_content with a stubbed Gemini that answers after
+--upstream-ms, once with HONEYPOT_METRICS=0 and once with metrics on, each
+in a fresh process with a scratch database and the response cache off, and
+reports the best mean time per call over --repeats interleaved runs.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SCORE = {
+    "scores": {k: 7 for k in ("clarity", "readability", "seo_potential", "persuasiveness", "structure", "originality")},
+    "overall": 7,
+    "top_improvements": ["a", "b", "c"],
+    "summary": "ok",
+}
+
+
+async def _run(calls: int, upstream_ms: float):
+    sys.path.insert(0, str(ROOT))
+    import analytics
+    import llm_client
+    import server
+
+    analytics.DB_PATH = str(Path(tempfile.mkdtemp()) / "bench.db")
+    analytics.init_db()
+    # Every call from a different caller, so the rate limit never trips.
+    analytics.check_rate_limit = lambda caller_id, max_per_minute=3: True
+    analytics.check_daily_global_cap = lambda max_daily=500, units=1: True
+    answer = json.dumps(SCORE)
+
+    async def generate(prompt, **kwargs):
+        if upstream_ms:
+            await asyncio.sleep(upstream_ms / 1000)
+        return answer
+
+    llm_client.generate = generate
+    async with analytics.call_writer():
+        for i in range(min(calls, 200)):
+            await server.call_tool("score_content", {"content": f"warmup {i}"})
+        started = time.perf_counter()
+        for i in range(calls):
+            await server.call_tool("score_content", {"content": f"document {i}"})
+        elapsed = time.perf_counter() - started
+    print(json.dumps({"us_per_call": elapsed / calls * 1e6}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--upstream-ms", type=float, default=0.0)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(_run(args.calls, args.upstream_ms))
+        return
+
+    results = {"off": [], "on": []}
+    for _ in range(args.repeats):
+        for label, flag in (("off", "0"), ("on", "1")):
+            env = {**os.environ, "HONEYPOT_METRICS": flag, "HONEYPOT_CACHE": "0", "HONEYPOT_NEARDUP": "0", "GEMINI_API_KEY": "bench"}
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", "--calls", str(args.calls), "--upstream-ms", str(args.upstream_ms)],
+                env=env, capture_output=True, text=True, check=True,
+            ).stdout
+            results[label].append(json.loads(out.strip().splitlines()[-1])["us_per_call"])
+    results = {label: min(runs) for label, runs in results.items()}
+    for label, us in results.items():
+        print(f"metrics {label:<3}  {us:8.1f} us/call")
+    overhead = results["on"] - results["off"]
+    print(f"overhead   {overhead:8.1f} us/call ({overhead / results['off'] * 100:.2f}% of call time)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Lookup latency of the near-duplicate index at a given number of stored documents.
+
+    python benchmarks/bench_neardup.py [--docs 100000] [--words 300] [--queries 1000] [--edits 3]
+
+Fills a scratch index with --docs random documents of --words words (drawn
+from a Zipf-like vocabulary), then times lookups of:
+
+- near duplicates: a stored document with --edits words replaced or inserted
+- new documents, which should not match
+
+The signature alone and the whole lookup (signature included) are timed,
+as p50/p95/p99. Recall is
+counted over the near duplicates whose exact Jaccard similarity (over the
+same word 4-grams) is at or above the threshold, alongside how many matched
+below it and how many new documents matched at all. Then --queries
+more documents are added with the index full, so every add also evicts, and
+the peak RSS and file size are printed.
+"""
+import argparse
+import array
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import neardup  # noqa: E402
+
+TOOL = "score_content"
+SCOPE = neardup.scope_of("bench", {"content_type": "blog post", "target_audience": "developers"})
+
+
+def _vocabulary(size: int, rng: random.Random) -> tuple[list[str], list[float]]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = ["".join(rng.choice(letters) for _ in range(rng.randint(2, 10))) for _ in range(size)]
+    return words, [1 / (rank + 1) for rank in range(size)]
+
+
+def _edit(text: str, edits: int, vocab: list[str], rng: random.Random) -> str:
+    words = text.split()
+    for _ in range(edits):
+        at = rng.randrange(len(words))
+        if rng.random() < 0.5:
+            words[at] = rng.choice(vocab)
+        else:
+            words.insert(at, rng.choice(vocab))
+    return " ".join(words)
+
+
+def _shingles(text: str) -> set:
+    words = neardup._words(text)
+    return {tuple(words[i:i + neardup.SHINGLE_WORDS]) for i in range(len(words) - neardup.SHINGLE_WORDS + 1)}
+
+
+def _jaccard(first: str, second: str) -> float:
+    a, b = _shingles(first), _shingles(second)
+    return len(a & b) / len(a | b)
+
+
+def _percentiles(values: list[float]) -> str:
+    cuts = statistics.quantiles(values, n=100)
+    return f"p50 {cuts[49] * 1000:7.2f}  p95 {cuts[94] * 1000:7.2f}  p99 {cuts[98] * 1000:7.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--words", type=int, default=300, help="words per document")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--edits", type=int, default=3, help="words changed in each near duplicate")
+    parser.add_argument("--threshold", type=float, default=neardup.NEARDUP_THRESHOLD)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocab, weights = _vocabulary(20_000, rng)
+
+    def document() -> str:
+        return " ".join(rng.choices(vocab, weights, k=args.words))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "neardup.db")
+        index = neardup.NearDupIndex(path, max_entries=args.docs, threshold=args.threshold)
+
+        sample = []
+        started = time.perf_counter()
+        for start in range(0, args.docs, 1000):
+            docs = [document() for _ in range(min(1000, args.docs - start))]
+            index.add_many([(TOOL, SCOPE, doc, "{}") for doc in docs])
+            sample.extend(rng.sample(docs, max(1, args.queries * len(docs) // args.docs)))
+            print(f"\rfilling: {start + len(docs):,}/{args.docs:,}", end="", file=sys.stderr)
+        fill = time.perf_counter() - started
+        print(file=sys.stderr)
+        print(f"filled {args.docs:,} documents of {args.words} words in {fill:.1f}s "
+              f"({args.docs / fill:,.0f}/s, signatures included)")
+
+        originals = sample[:args.queries]
+        near = [_edit(doc, args.edits, vocab, rng) for doc in originals]
+        above = [_jaccard(doc, edited) >= args.threshold for doc, edited in zip(originals, near)]
+        for label, queries in (("near duplicates", near), ("new documents", [document() for _ in range(args.queries)])):
+            sig_times, find_times, hits, scores = [], [], [], []
+            for text in queries:
+                t0 = time.perf_counter()
+                neardup.signature(text)
+                t1 = time.perf_counter()
+                match = index.find(TOOL, SCOPE, text)
+                t2 = time.perf_counter()
+                sig_times.append(t1 - t0)
+                find_times.append(t2 - t1)
+                hits.append(match is not None)
+                if match:
+                    scores.append(match.similarity)
+            if queries is near:
+                wanted = sum(above)
+                found = sum(hit for hit, want in zip(hits, above) if want)
+                extra = sum(hit for hit, want in zip(hits, above) if not want)
+                outcome = (f"{wanted:,} at or above {args.threshold} exact similarity, "
+                           f"{found / max(wanted, 1):.1%} of them found; {extra:,} of the rest matched")
+            else:
+                outcome = f"{sum(hits) / len(queries):.1%} matched"
+            if scores:
+                outcome += f"; mean estimated similarity {statistics.fmean(scores):.3f}"
+            print(f"\n{label} ({len(queries):,}): {outcome}")
+            print(f"  signature  {_percentiles(sig_times)}")
+            print(f"  lookup     {_percentiles(find_times)}")
+
+        add_times = []
+        for _ in range(args.queries):
+            doc = document()
+            t0 = time.perf_counter()
+            index.add(TOOL, SCOPE, doc, "{}")
+            add_times.append(time.perf_counter() - t0)
+        print(f"\nadd at capacity (evicting) ({args.queries:,}): {_percentiles(add_times)}")
+        print(f"entries {index.stats()['entries']:,}, "
+              f"file {sum(os.path.getsize(p) for p in Path(tmp).iterdir()) / 1e6:.0f} MB, "
+              f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+        # Signatures are compared in Python: the cost of one comparison, for scale.
+        sig = neardup.signature(document())
+        t0 = time.perf_counter()
+        for _ in range(1000):
+            neardup.similarity(sig, array.array("I", sig.tobytes()))
+        print(f"one signature comparison: {(time.perf_counter() - t0) * 1000:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Memory and time spent building prompts: str.format versus template parts.
+
+    python benchmarks/bench_prompts.py [--chars 10000] [--iterations 1000]
+
+For each scenario, builds what a request needs before it reaches the network:
+the prompt(s), the response-cache key, the single-flight key, and the SDK's
+Content objects for the text llm_client sends. "format" joins each prompt
+with str.format as the handlers used to; "parts" uses Template.parts.
+
+Memory is measured with tracemalloc for one request, not counting the
+request's own arguments: peak is the most held at once while building it,
+and retained is what the built request still holds. Times are the best of
+five runs of --iterations.
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import cache  # noqa: E402
+import llm_client  # noqa: E402
+import prompts  # noqa: E402
+from google.genai import _transformers  # noqa: E402
+
+PERSONAS = (prompts.VC_ATTACK, prompts.TECHNICAL_ATTACK, prompts.REGULATORY_ATTACK)
+
+
+def _document(chars: int) -> str:
+    line = "Our platform reconciles invoices against bank feeds and flags exceptions for review.\n"
+    return (line * (chars // len(line) + 1))[:chars]
+
+
+def _keyed(tool: str, key_args: dict, system: str, prompt):
+    return (
+        prompt,
+        cache.make_key(tool, key_args, prompt, system),
+        llm_client._flight_key("route", system, prompt),
+        _transformers.t_contents(llm_client._contents(prompt)),
+    )
+
+
+def fanout(document: str, joined: bool):
+    key_args = {"document": document, "attack_type": "full", "domain": "fintech"}
+    built = []
+    for template, system in zip(PERSONAS, (prompts.VC_ATTACK_SYSTEM, prompts.TECHNICAL_ATTACK_SYSTEM, prompts.REGULATORY_ATTACK_SYSTEM)):
+        if joined:
+            prompt = template.source.format(domain="fintech", document=document)
+        else:
+            prompt = template.parts(domain="fintech", document=document)
+        built.append(_keyed("red_team_attack", key_args, system, prompt))
+    return built
+
+
+def score(document: str, joined: bool):
+    values = {"content_type": "blog post", "target_audience": "developers", "content": document}
+    if joined:
+        prompt = prompts.CONTENT_SCORE.source.format(**values)
+    else:
+        prompt = prompts.CONTENT_SCORE.parts(**values)
+    return _keyed("score_content", values, prompts.CONTENT_SCORE_SYSTEM, prompt)
+
+
+def _pack(document: str) -> list[dict]:
+    chunk = document[:1500]
+    return [
+        {"id": str(i), "content_type": "general", "target_audience": "general audience", "content": f"{i} {chunk}"}
+        for i in range(8)
+    ]
+
+
+def packed(pack: list[dict], joined: bool):
+    if joined:
+        items = "\n\n".join(prompts.CONTENT_SCORE_BATCH_ITEM.source.format(**item) for item in pack)
+        prompt = prompts.CONTENT_SCORE_BATCH.source.format(count=len(pack), items=items)
+    else:
+        items = []
+        for item in pack:
+            if items:
+                items.append("\n\n")
+            items.extend(prompts.CONTENT_SCORE_BATCH_ITEM.parts(**item))
+        prompt = prompts.CONTENT_SCORE_BATCH.parts(count=len(pack), items=items)
+    return _keyed("score_content_batch", {"documents": pack}, prompts.CONTENT_SCORE_BATCH_SYSTEM, prompt)
+
+
+# name -> (build(arguments, joined), arguments from the document)
+SCENARIOS = {
+    "red_team full (fanout)": (fanout, str),
+    "score_content": (score, str),
+    "score_content_batch pack of 8": (packed, _pack),
+}
+
+
+def _check_equal(document: str):
+    for name, (build, make_input) in SCENARIOS.items():
+        arguments = make_input(document)
+        a, b = build(arguments, True), build(arguments, False)
+        for x, y in zip(a if isinstance(a, list) else [a], b if isinstance(b, list) else [b]):
+            assert x[0] == "".join(y[0]), f"{name}: parts do not join to the formatted prompt"
+
+
+def _memory(build, arguments, joined: bool) -> tuple[int, int]:
+    build(arguments, joined)  # warm caches and interned strings
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        kept = build(arguments, joined)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del kept
+    return peak - base, current - base
+
+
+def _time(build, arguments, joined: bool, iterations: int, repeats: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            build(arguments, joined)
+        best = min(best, time.perf_counter() - started)
+    return best / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chars", type=int, default=10_000, help="document size")
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+
+    document = _document(args.chars)
+    _check_equal(document)
+    print(f"{args.chars}-char document; memory per request (KiB) and build time (µs)")
+    print(f"{'scenario':<32} {'variant':<7} {'peak':>8} {'retained':>9} {'time':>8}")
+    for name, (build, make_input) in SCENARIOS.items():
+        arguments = make_input(document)
+        for variant, joined in (("format", True), ("parts", False)):
+            peak, retained = _memory(build, arguments, joined)
+            micros = _time(build, arguments, joined, args.iterations)
+            print(f"{name:<32} {variant:<7} {peak / 1024:>8.1f} {retained / 1024:>9.1f} {micros:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Rate-limit admission cost with many distinct callers.
+
+    python benchmarks/bench_ratelimit.py [--callers 10000] [--rounds 5]
+
+Every round admits each caller once, so the limiter holds --callers live
+entries while it is measured.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import analytics
+
+
+def run(backend: str, callers: int, rounds: int):
+    limiter = analytics.RATE_LIMITERS[backend]()
+    ids = [f"caller-{i:06d}" for i in range(callers)]
+    admitted = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for caller_id in ids:
+            admitted += limiter.admit(caller_id, 3)
+    elapsed = time.perf_counter() - start
+    ops = callers * rounds
+    print(f"{backend:<8} {callers:>6} callers  {ops:>7} admissions  "
+          f"{elapsed / ops * 1e6:>9.2f} us/op  {ops / elapsed:>10.0f} ops/s  admitted={admitted}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--callers", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--sqlite-rounds", type=int, default=1,
+                        help="rounds for the sqlite backend, which is orders of magnitude slower")
+    args = parser.parse_args()
+
+    run("memory", args.callers, args.rounds)
+    with tempfile.TemporaryDirectory() as tmp:
+        analytics.DB_PATH = os.path.join(tmp, "bench.db")
+        analytics.close_all()
+        run("sqlite", args.callers, args.sqlite_rounds)
+        analytics.close_all()
+
+
+if __name__ == "__main__":
+    main()
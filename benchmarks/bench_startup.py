@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Cold start of the stdio server, as an MCP client launching it per session sees it.
+
+    python benchmarks/bench_startup.py [--runs 5] [--idle-ms 1000] [--latency-ms 100]
+
+Import: `import server` in a fresh interpreter, best and median of --runs,
+and whether google.genai was loaded by it.
+
+Time to first response: spawns `server.py` over stdio against
+benchmarks/fake_gemini.py, --runs times on one scratch database (as
+successive sessions share honeypot.db), and times each step from the spawn:
+initialize, list_tools, then after --idle-ms (the client's own think time)
+the first score_content call and a second, warm one for comparison. Each
+step is run with HONEYPOT_PREWARM=1 and =0.
+
+The fake is plain HTTP, so the prewarmed connection saves a TCP handshake
+here but a TCP+TLS one against Google.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from load_test import ROOT, _server_env, _start_fake
+
+IMPORT_PROBE = (
+    "import sys, time; started = time.perf_counter(); import server; "
+    "print(time.perf_counter() - started, 'google.genai' in sys.modules)"
+)
+STEPS = ("initialize", "list_tools", "first call", "second call")
+
+
+def _import_times(runs: int) -> tuple[list[float], bool]:
+    times, loaded = [], False
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_PROBE], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.split()
+        times.append(float(out[0]))
+        loaded = out[1] == "True"
+    return times, loaded
+
+
+async def _session(env: dict, idle: float) -> dict:
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    params = StdioServerParameters(command=sys.executable, args=[str(ROOT / "server.py")], env=env, cwd=str(ROOT))
+    arguments = {"content": "Ship faster with fewer meetings. Our tool writes your status updates.", "content_type": "ad"}
+    timings = {}
+    with open(os.devnull, "w") as devnull:
+        started = time.perf_counter()
+        async with stdio_client(params, errlog=devnull) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                timings["initialize"] = time.perf_counter() - started
+                await session.list_tools()
+                timings["list_tools"] = time.perf_counter() - started
+                await asyncio.sleep(idle)
+                for step in ("first call", "second call"):
+                    call_started = time.perf_counter()
+                    result = await session.call_tool("score_content", arguments)
+                    if result.isError or result.content[0].text.startswith("Error"):
+                        raise RuntimeError(f"score_content failed: {result.content[0].text[:200]}")
+                    # Calls are timed on their own, without the idle wait.
+                    timings[step] = time.perf_counter() - call_started
+    return timings
+
+
+def _ms(values: list[float]) -> str:
+    return f"{statistics.median(values) * 1000:>9.0f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--idle-ms", type=float, default=1000, help="pause between list_tools and the first call")
+    parser.add_argument("--latency-ms", type=float, default=100, help="median fake Gemini latency")
+    parser.add_argument("--sigma", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    times, loaded = _import_times(args.runs)
+    print(f"import server: best {min(times) * 1000:.0f} ms, median {statistics.median(times) * 1000:.0f} ms "
+          f"(google.genai {'loaded' if loaded else 'not loaded'})")
+
+    fake, url = _start_fake(args)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            results = {}
+            for prewarm in ("1", "0"):
+                env = {**_server_env(url, str(Path(tmp) / "startup.db"), "memory"), "HONEYPOT_PREWARM": prewarm}
+                runs = [asyncio.run(_session(env, args.idle_ms / 1000)) for _ in range(args.runs)]
+                results[prewarm] = {step: [run[step] for run in runs] for step in STEPS}
+    finally:
+        fake.terminate()
+
+    print(f"\nmedian ms over {args.runs} sessions; initialize and list_tools from spawn, calls on their own")
+    print(f"{'prewarm':<8}" + "".join(f"{step:>14}" for step in STEPS))
+    for prewarm, label in (("1", "on"), ("0", "off")):
+        print(f"{label:<8}" + "".join(f"{_ms(results[prewarm][step]):>14}" for step in STEPS))
+
+
+if __name__ == "__main__":
+    main()
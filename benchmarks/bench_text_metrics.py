@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Throughput of the local text metrics behind score_content's fast mode.
+
+    python benchmarks/bench_text_metrics.py [--docs 10000] [--min-words 50] [--max-words 3000] [--files 'docs/**/*.md']
+
+Builds a corpus of --docs synthetic Markdown documents: headings, paragraphs
+of varied sentence length, lists and links, with lengths spread log-uniformly
+between --min-words and --max-words. With --files, the matching files are used
+instead, cycled up to --docs. Each document is analyzed once to warm the
+syllable cache, then the corpus is timed for:
+
+- analyze: text_metrics.analyze alone
+- analyze + score: also the scores, improvements and the metrics summary
+  that standard mode puts in the prompt
+
+Results are documents, words and MB per second on one core, and per-document
+p50/p99 latency by length band.
+"""
+import argparse
+import glob
+import math
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import text_metrics  # noqa: E402
+
+BANDS = ((0, 300), (300, 1000), (1000, 3000), (3000, 10**9))
+
+
+def _corpus(count: int, min_words: int, max_words: int, rng: random.Random) -> list[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocab = ["".join(rng.choice(letters) for _ in range(rng.choice((1, 2, 3, 3, 4, 5, 6, 8, 11)))) for _ in range(8000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocab))]
+
+    def make_sentence() -> str:
+        words = rng.choices(vocab, weights, k=max(3, int(rng.gauss(17, 8))))
+        return " ".join(words).capitalize() + rng.choice(".....?!")
+
+    # Documents are drawn from a pool of sentences, which keeps building
+    # 10,000 of them quick; the pool is large enough that few repeat.
+    pool = [make_sentence() for _ in range(50_000)]
+
+    def sentence() -> str:
+        return rng.choice(pool)
+
+    docs = []
+    for _ in range(count):
+        target = int(math.exp(rng.uniform(math.log(min_words), math.log(max_words))))
+        parts, words = [f"# {sentence()[:-1]}"], 0
+        while words < target:
+            roll = rng.random()
+            if roll < 0.12:
+                parts.append(f"## {sentence()[:-1]}")
+            elif roll < 0.22:
+                parts.append("\n".join(f"- {sentence()}" for _ in range(rng.randint(2, 6))))
+            else:
+                text = " ".join(sentence() for _ in range(rng.randint(1, 7)))
+                if rng.random() < 0.2:
+                    text += f" See [the guide](https://example.com/{rng.randint(1, 999)})."
+                parts.append(text)
+            words += len(parts[-1].split())
+        docs.append("\n\n".join(parts))
+    return docs
+
+
+def _fast(doc: str):
+    stats = text_metrics.analyze(doc)
+    scores, improvements = text_metrics.score(stats, "blog post")
+    return text_metrics.brief(stats, scores), improvements[:3]
+
+
+def _run(label: str, fn, docs: list[str], words: list[int]):
+    times = []
+    started = time.perf_counter()
+    for doc in docs:
+        t0 = time.perf_counter()
+        fn(doc)
+        times.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    size = sum(len(doc.encode()) for doc in docs)
+    print(f"\n{label}: {len(docs) / elapsed:,.0f} docs/s, {sum(words) / elapsed / 1e6:.2f}M words/s, "
+          f"{size / elapsed / 1e6:.1f} MB/s ({elapsed:.2f}s)")
+    for low, high in BANDS:
+        band = [t for t, n in zip(times, words) if low <= n < high]
+        if len(band) < 2:
+            continue
+        cuts = statistics.quantiles(band, n=100)
+        name = f"{low}-{high} words" if high < 10**9 else f"{low}+ words"
+        print(f"  {name:<16} {len(band):>6} docs  p50 {cuts[49] * 1000:6.2f} ms  p99 {cuts[98] * 1000:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=10_000)
+    parser.add_argument("--min-words", type=int, default=50)
+    parser.add_argument("--max-words", type=int, default=3000)
+    parser.add_argument("--files", help="glob of text files to use instead of the synthetic corpus")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.files:
+        texts = [Path(p).read_text(errors="replace") for p in sorted(glob.glob(args.files, recursive=True))]
+        if not texts:
+            parser.error(f"no files match {args.files}")
+        docs = [texts[i % len(texts)] for i in range(args.docs)]
+    else:
+        docs = _corpus(args.docs, args.min_words, args.max_words, random.Random(args.seed))
+    words = [text_metrics.analyze(doc)["words"] for doc in docs]
+    print(f"corpus: {len(docs):,} documents, {sum(words):,} words, "
+          f"median {statistics.median(words):,.0f} words, {sum(map(len, docs)) / 1e6:.1f}M chars")
+
+    _run("analyze", text_metrics.analyze, docs, words)
+    _run("analyze + score", _fast, docs, words)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Compare red_team_attack full in fanout (3 requests) and fused (1 request) mode.
+
+    GEMINI_API_KEY=... python benchmarks/compare_fused.py [--runs 3] [--document FILE]
+
+For each mode, reports wall-clock latency, input/output tokens as billed by
+Gemini and the resulting cost. The response cache is disabled so every run
+reaches the model.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+os.environ["HONEYPOT_CACHE"] = "0"
+os.environ["HONEYPOT_NEARDUP"] = "0"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import llm_client
+import server
+
+# USD per million tokens for gemini-2.0-flash (text input, output, cached input).
+PRICE_INPUT = 0.10
+PRICE_OUTPUT = 0.40
+PRICE_CACHED = 0.025
+
+DOCUMENT = """# Ledgerly: real-time treasury for mid-market companies
+
+Ledgerly connects to a company's bank accounts, ERP and payroll provider and
+forecasts cash 13 weeks out. It automatically sweeps idle balances into money
+market funds through our broker-dealer partner and moves funds back before
+payroll runs. We charge 0.15% of assets under management plus $2,000/month.
+
+Go-to-market: outbound to CFOs at companies with $50M-$500M revenue, with a
+target of 120 customers in 18 months. We store bank credentials encrypted in
+our own database and use screen scraping where APIs are not available.
+The forecasting model is trained on pooled customer data across all tenants.
+"""
+
+
+def _cost(stats: dict) -> float:
+    uncached = stats["prompt_tokens"] - stats["cached_tokens"]
+    return (uncached * PRICE_INPUT + stats["cached_tokens"] * PRICE_CACHED
+            + stats["output_tokens"] * PRICE_OUTPUT) / 1_000_000
+
+
+async def run_mode(execution: str, document: str, runs: int) -> dict:
+    llm_client.reset_usage_stats()
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await server._red_team({"document": document, "attack_type": "full", "execution": execution})
+        latencies.append((time.perf_counter() - start) * 1000)
+    totals = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "output_tokens": 0}
+    for stats in llm_client.usage_stats().get("red_team_attack", {}).values():
+        for key in totals:
+            totals[key] += stats[key]
+    return {
+        "execution": execution,
+        "requests": totals["calls"] / runs,
+        "p50_ms": statistics.median(latencies),
+        "max_ms": max(latencies),
+        "input_tokens": totals["prompt_tokens"] / runs,
+        "output_tokens": totals["output_tokens"] / runs,
+        "cost_usd": _cost(totals) / runs,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--document", type=Path, help="document to red-team (default: built-in sample)")
+    args = parser.parse_args()
+    document = args.document.read_text() if args.document else DOCUMENT
+
+    rows = [await run_mode(execution, document, args.runs) for execution in ("fanout", "fused")]
+    await llm_client.aclose()
+
+    print(f"{'mode':<8} {'req/run':>7} {'p50 ms':>8} {'max ms':>8} {'in tok':>8} {'out tok':>8} {'cost $':>10}")
+    for r in rows:
+        print(f"{r['execution']:<8} {r['requests']:>7.1f} {r['p50_ms']:>8.0f} {r['max_ms']:>8.0f} "
+              f"{r['input_tokens']:>8.0f} {r['output_tokens']:>8.0f} {r['cost_usd']:>10.6f}")
+    fanout, fused = rows
+    if fanout["cost_usd"]:
+        print(f"fused/fanout: cost {fused['cost_usd'] / fanout['cost_usd']:.2f}x, "
+              f"latency {fused['p50_ms'] / fanout['p50_ms']:.2f}x, "
+              f"input tokens {fused['input_tokens'] / max(fanout['input_tokens'], 1):.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Gemini REST API, for load tests that must not spend quota.
+
+    python benchmarks/fake_gemini.py --port 8600 [--latency-ms 800] [--sigma 0.5] [--error-rate 0.02]
+
+Then point the server at it with GEMINI_BASE_URL=http://127.0.0.1:8600.
+
+Serves generateContent and streamGenerateContent (SSE) for any model. Each
+request waits a log-normally distributed time with the given median and
+sigma, and fails with 429 or 503 at --error-rate. Requests carrying a
+responseSchema get a JSON answer built from the schema; all others get
+--output-chars of filler text. Context-cache creation is refused, so the
+server sends prompt prefixes inline.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+FILLER = "The proposal is plausible but leans on optimistic assumptions about adoption and cost. "
+
+
+class FakeGemini:
+    def __init__(self, latency_ms: float, sigma: float, error_rate: float, output_chars: int, chunks: int):
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.output_chars = output_chars
+        self.chunks = chunks
+        self.requests = 0
+        self.errors = 0
+
+    def _delay(self) -> float:
+        if self.latency_ms <= 0:
+            return 0.0
+        return random.lognormvariate(math.log(self.latency_ms / 1000), self.sigma)
+
+    def _sample(self, schema: dict, prompt: str):
+        kind = (schema.get("type") or "").lower()
+        if kind == "object":
+            return {name: self._sample(sub, prompt) for name, sub in schema.get("properties", {}).items()}
+        if kind == "array":
+            # The SDK sends some schema keys in snake_case, and integers as strings.
+            count = int(schema.get("minItems") or schema.get("min_items") or 1)
+            item = schema.get("items", {})
+            if "id" in item.get("properties", {}):
+                # Packed batch prompts: one entry per <content id="..."> block.
+                ids = re.findall(r'<content id="([^"]*)"', prompt)
+                return [{**self._sample(item, prompt), "id": i} for i in ids]
+            return [self._sample(item, prompt) for _ in range(count)]
+        if kind == "integer":
+            return int(schema.get("minimum", 1) + (schema.get("maximum", 10) - schema.get("minimum", 1)) // 2)
+        if kind == "number":
+            return float(schema.get("minimum", 1) + (schema.get("maximum", 10) - schema.get("minimum", 1)) / 2)
+        if kind == "boolean":
+            return True
+        return FILLER.strip()
+
+    def _answer(self, body: dict) -> str:
+        prompt = "".join(
+            part.get("text", "")
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        config = body.get("generationConfig") or {}
+        schema = config.get("responseSchema") or config.get("responseJsonSchema")
+        if schema:
+            return json.dumps(self._sample(schema, prompt))
+        return (FILLER * (self.output_chars // len(FILLER) + 1))[:self.output_chars]
+
+    @staticmethod
+    def _payload(text: str, prompt_tokens: int, output_tokens: int, final: bool) -> dict:
+        candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+        if final:
+            candidate["finishReason"] = "STOP"
+        return {
+            "candidates": [candidate],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": output_tokens,
+                "totalTokenCount": prompt_tokens + output_tokens,
+            },
+            "modelVersion": "fake",
+        }
+
+    async def handle(self, request: Request):
+        path = request.url.path
+        self.requests += 1
+        if "cachedContents" in path:
+            return JSONResponse({"error": {"code": 400, "message": "context caching disabled", "status": "INVALID_ARGUMENT"}}, 400)
+        body = await request.json()
+        delay = self._delay()
+        if random.random() < self.error_rate:
+            self.errors += 1
+            await asyncio.sleep(delay / 4)
+            code, status = random.choice(((429, "RESOURCE_EXHAUSTED"), (503, "UNAVAILABLE")))
+            return JSONResponse({"error": {"code": code, "message": "fake overload", "status": status}}, code)
+
+        text = self._answer(body)
+        prompt_tokens = max(1, len(json.dumps(body.get("contents", []))) // 4)
+        output_tokens = max(1, len(text) // 4)
+
+        if path.endswith(":streamGenerateContent"):
+            size = max(1, math.ceil(len(text) / self.chunks))
+            pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+            async def events():
+                for i, piece in enumerate(pieces):
+                    await asyncio.sleep(delay / len(pieces))
+                    final = i == len(pieces) - 1
+                    payload = self._payload(piece, prompt_tokens, output_tokens if final else 0, final)
+                    yield f"data: {json.dumps(payload)}\r\n\r\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(delay)
+        return JSONResponse(self._payload(text, prompt_tokens, output_tokens, True))
+
+    async def stats(self, request: Request):
+        return JSONResponse({"requests": self.requests, "errors": self.errors})
+
+
+def create_app(fake: FakeGemini) -> Starlette:
+    return Starlette(routes=[
+        Route("/_stats", fake.stats, methods=["GET"]),
+        Route("/{path:path}", fake.handle, methods=["POST", "GET", "PATCH", "DELETE"]),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="median upstream latency")
+    parser.add_argument("--sigma", type=float, default=0.5, help="log-normal spread of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered 429/503")
+    parser.add_argument("--output-chars", type=int, default=2000)
+    parser.add_argument("--chunks", type=int, default=20, help="SSE chunks per streamed answer")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    fake = FakeGemini(args.latency_ms, args.sigma, args.error_rate, args.output_chars, args.chunks)
+    uvicorn.run(create_app(fake), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
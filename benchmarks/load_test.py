@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Load test every tool against a local fake Gemini, over HTTP and stdio.
+
+    python benchmarks/load_test.py [--transport http stdio] [--scenario score_content ...]
+                                   [--requests 200] [--concurrency 16]
+                                   [--latency-ms 300] [--sigma 0.5] [--error-rate 0.0]
+                                   [--backend memory|sqlite] [--compare [RESULT.json]]
+
+Starts benchmarks/fake_gemini.py, then runs each scenario (a tool, plus a mode
+where the tool has one) in a fresh server process on a scratch database, with
+the response cache off and rate limits out of the way. HTTP runs drive
+`server.py --http` with raw JSON-RPC POSTs; stdio runs drive one
+`mcp.client.stdio` session with that many requests in flight.
+
+For each run it reports client-side throughput and p50/p95/p99 latency, and
+reads the server's own metrics afterwards (/metrics, or HONEYPOT_METRICS_FILE
+for stdio): event loop lag, and p95 of the SQLite stages (rate limit and
+daily cap checks, log_call, the batched call writes) as a measure of
+contention.
+
+Results are saved to benchmarks/results/<UTC timestamp>.json with the git
+revision and settings. --compare prints each p95 and throughput against a
+previous result file (the most recent one when no path is given).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+DOCUMENT = (
+    "Acme Ledger is a reconciliation service for mid-market finance teams. It ingests bank feeds, "
+    "matches them against invoices with a learned model, and flags exceptions for review. "
+) * 8
+VERSE = "OnBegin<override>()<suspends>:void =\n    Print(\"Hello\")\n"
+
+
+def _doc(i: int) -> str:
+    # Distinct per request so single-flight de-duplication cannot merge them.
+    return f"Request {i}. {DOCUMENT}"
+
+
+SCENARIOS = {
+    "score_content": ("score_content", lambda i: {"content": _doc(i)}),
+    "red_team_attack:quick": ("red_team_attack", lambda i: {"document": _doc(i), "attack_type": "quick"}),
+    "red_team_attack:full-fanout": (
+        "red_team_attack", lambda i: {"document": _doc(i), "attack_type": "full", "execution": "fanout"}),
+    "red_team_attack:full-fused": (
+        "red_team_attack", lambda i: {"document": _doc(i), "attack_type": "full", "execution": "fused"}),
+    "deep_research:quick": ("deep_research", lambda i: {"topic": f"Reconciliation tooling #{i}", "depth": "quick"}),
+    "verse_assist:explain": ("verse_assist", lambda i: {"task": f"Explain #{i}", "code": VERSE, "mode": "explain"}),
+    "score_content_batch": (
+        "score_content_batch", lambda i: {"documents": [{"content": _doc(i * 10 + j)} for j in range(10)]}),
+}
+
+# Stages of honeypot_stage_seconds that touch SQLite.
+SQLITE_STAGES = ("rate_limit", "daily_cap", "log_call", "sqlite_write")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _histogram_quantile(text: str, name: str, q: float, match: str = "") -> float | None:
+    """Estimate quantile q of a Prometheus histogram, summing all series whose
+    labels contain ``match``. Interpolates linearly inside the bucket."""
+    buckets = {}
+    for line in text.splitlines():
+        if not line.startswith(name + "_bucket{") or match not in line:
+            continue
+        sample, value = line.rsplit(" ", 1)
+        bound = sample.split('le="', 1)[1].split('"', 1)[0]
+        upper = math.inf if bound == "+Inf" else float(bound)
+        buckets[upper] = buckets.get(upper, 0.0) + float(value)
+    if not buckets:
+        return None
+    bounds = sorted(buckets)
+    total = buckets[bounds[-1]]
+    if total == 0:
+        return None
+    target = q * total
+    lower, below = 0.0, 0.0
+    for upper in bounds:
+        count = buckets[upper]
+        if count >= target:
+            if math.isinf(upper):
+                return lower
+            return lower + (upper - lower) * (target - below) / max(count - below, 1e-9)
+        lower, below = upper, count
+    return lower
+
+
+def _server_metrics(text: str) -> dict:
+    def ms(value):
+        return None if value is None else round(value * 1000, 2)
+
+    return {
+        "loop_lag_p99_ms": ms(_histogram_quantile(text, "honeypot_event_loop_lag_seconds", 0.99)),
+        "sqlite_p95_ms": {
+            stage: ms(_histogram_quantile(text, "honeypot_stage_seconds", 0.95, f'stage="{stage}"'))
+            for stage in SQLITE_STAGES
+        },
+        "upstream_p95_ms": ms(_histogram_quantile(text, "honeypot_upstream_seconds", 0.95, 'outcome="ok"')),
+    }
+
+
+def _server_env(fake_url: str, db_path: str, backend: str) -> dict:
+    return {
+        **os.environ,
+        "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "unused"),
+        "GEMINI_BASE_URL": fake_url,
+        "GEMINI_CONTEXT_CACHE": "0",
+        "HONEYPOT_CACHE": "0",
+        "HONEYPOT_NEARDUP": "0",
+        "HONEYPOT_DB_PATH": db_path,
+        "HONEYPOT_RATE_LIMIT": "1000000",
+        "HONEYPOT_DAILY_CAP": "1000000000",
+        "HONEYPOT_RATE_LIMIT_BACKEND": backend,
+        "HONEYPOT_COUNTER_BACKEND": backend,
+        "HONEYPOT_METRICS": "1",
+    }
+
+
+def _failed(text: str) -> bool:
+    # Tool errors come back as ordinary text content starting "Error:".
+    return '"isError":true' in text or '"text":"Error:' in text or text.startswith("Error:")
+
+
+def _summarise(latencies: list[float], failures: int, elapsed: float) -> dict:
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "failures": failures,
+        "rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 1),
+    }
+
+
+async def _run_http(env: dict, tool: str, make_args, requests: int, concurrency: int) -> dict:
+    port = _free_port()
+    env = {**env, "PORT": str(port), "HOST": "127.0.0.1"}
+    proc = subprocess.Popen(
+        [sys.executable, str(ROOT / "server.py"), "--http"],
+        env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    latencies = []
+    failures = 0
+    counter = iter(range(requests))
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal failures
+        for i in counter:
+            body = {"jsonrpc": "2.0", "id": i, "method": "tools/call",
+                    "params": {"name": tool, "arguments": make_args(i)}}
+            started = time.perf_counter()
+            try:
+                response = await client.post(
+                    url + "/mcp/", json=body, headers={"Accept": "application/json, text/event-stream"},
+                )
+                ok = response.status_code == 200 and not _failed(response.text)
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            failures += not ok
+
+    try:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(limits=limits, timeout=120.0) as client:
+            for _ in range(200):
+                if proc.poll() is not None:
+                    raise RuntimeError("server exited during startup")
+                try:
+                    if (await client.get(url + "/stats")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.1)
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+            server_text = (await client.get(url + "/metrics")).text
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    return {**_summarise(latencies, failures, elapsed), **_server_metrics(server_text)}
+
+
+async def _run_stdio(env: dict, tool: str, make_args, requests: int, concurrency: int) -> dict:
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    metrics_file = Path(env["HONEYPOT_DB_PATH"]).with_suffix(".metrics")
+    params = StdioServerParameters(
+        command=sys.executable, args=[str(ROOT / "server.py")],
+        env={**env, "HONEYPOT_METRICS_FILE": str(metrics_file)}, cwd=str(ROOT),
+    )
+    latencies = []
+    failures = 0
+    counter = iter(range(requests))
+
+    async def worker(session: ClientSession):
+        nonlocal failures
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                result = await session.call_tool(tool, make_args(i))
+                ok = not result.isError and not _failed(result.content[0].text if result.content else "")
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            failures += not ok
+
+    with open(os.devnull, "w") as devnull:
+        async with stdio_client(params, errlog=devnull) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                started = time.perf_counter()
+                await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+                elapsed = time.perf_counter() - started
+    # The server writes the file on its way out, after stdin closes.
+    for _ in range(50):
+        if metrics_file.exists():
+            break
+        await asyncio.sleep(0.1)
+    server_text = metrics_file.read_text() if metrics_file.exists() else ""
+    return {**_summarise(latencies, failures, elapsed), **_server_metrics(server_text)}
+
+
+def _start_fake(args) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, str(Path(__file__).parent / "fake_gemini.py"), "--port", str(port),
+         "--latency-ms", str(args.latency_ms), "--sigma", str(args.sigma),
+         "--error-rate", str(args.error_rate)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(url + "/_stats", timeout=1.0)
+            return proc, url
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("fake Gemini server did not start")
+
+
+def _latest_result() -> Path | None:
+    files = sorted(RESULTS_DIR.glob("*.json"))
+    return files[-1] if files else None
+
+
+def _print_comparison(current: dict, previous: dict, label: str):
+    print(f"\nCompared with {label} ({previous.get('revision', '?')}):")
+    print(f"{'run':<42} {'req/s':>16} {'p95 ms':>20}")
+    for key, r in current["runs"].items():
+        old = previous.get("runs", {}).get(key)
+        if not old:
+            continue
+
+        def change(new, before):
+            return f"{(new - before) / before * 100:+.0f}%" if before else "n/a"
+
+        print(f"{key:<42} {r['rps']:>8.1f} {change(r['rps'], old['rps']):>7} "
+              f"{r['p95_ms']:>10.1f} {change(r['p95_ms'], old['p95_ms']):>9}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--transport", nargs="+", choices=["http", "stdio"], default=["http", "stdio"])
+    parser.add_argument("--scenario", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="median fake Gemini latency")
+    parser.add_argument("--sigma", type=float, default=0.5, help="log-normal spread of the fake latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of fake Gemini requests failing 429/503")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory",
+                        help="rate limit and counter backend for the server")
+    parser.add_argument("--compare", nargs="?", const="latest", metavar="RESULT.json",
+                        help="compare with a saved result (default: the most recent)")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    previous_path = None
+    if args.compare:
+        previous_path = _latest_result() if args.compare == "latest" else Path(args.compare)
+
+    fake, fake_url = _start_fake(args)
+    result = {
+        "revision": _git_revision(),
+        "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "cpus": os.cpu_count(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("compare", "no_save")},
+        "runs": {},
+    }
+    print(f"{'run':<42} {'req/s':>7} {'p50':>7} {'p95':>7} {'p99':>7} {'fail':>5} "
+          f"{'lag p99':>8} {'log_call':>8} {'sql_wr':>7}")
+    try:
+        for transport in args.transport:
+            runner = _run_http if transport == "http" else _run_stdio
+            for name in args.scenario:
+                tool, make_args = SCENARIOS[name]
+                db_path = str(Path(tempfile.mkdtemp()) / "honeypot.db")
+                env = _server_env(fake_url, db_path, args.backend)
+                r = await runner(env, tool, make_args, args.requests, args.concurrency)
+                key = f"{transport}/{name}"
+                result["runs"][key] = r
+                sqlite = r["sqlite_p95_ms"]
+                print(f"{key:<42} {r['rps']:>7.1f} {r['p50_ms']:>7.0f} {r['p95_ms']:>7.0f} {r['p99_ms']:>7.0f} "
+                      f"{r['failures']:>5} {r['loop_lag_p99_ms'] or 0:>8.1f} "
+                      f"{sqlite['log_call'] or 0:>8.2f} {sqlite['sqlite_write'] or 0:>7.2f}")
+    finally:
+        fake.terminate()
+        fake.wait(timeout=10)
+
+    if not args.no_save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        path = RESULTS_DIR / (datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + ".json")
+        path.write_text(json.dumps(result, indent=2))
+        print(f"\nSaved {path.relative_to(ROOT)}")
+    if previous_path:
+        _print_comparison(result, json.loads(previous_path.read_text()), previous_path.name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Throughput of the Streamable HTTP server by uvicorn worker count.
+
+    python benchmarks/load_workers.py [--workers 1 2 4] [--requests 2000] [--concurrency 64]
+
+For each worker count, starts `server.py --http --workers N` on a scratch
+database and drives score_content over raw JSON-RPC POSTs. Gemini is never
+called: the responses are put in a shared on-disk response cache first, so
+every request exercises only the server's own work (MCP framing, JSON,
+hashing, rate limiting, counters and SQLite writes).
+
+After each run it checks the free tier held across workers: for a caller
+with k calls, exactly k - FREE_TIER_LIMIT of them must be marked
+would_have_charged. With per-process counters (--backend memory) each
+worker hands out its own free calls and the check fails.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SCORE = {
+    "scores": {k: 7 for k in ("clarity", "readability", "seo_potential", "persuasiveness", "structure", "originality")},
+    "overall": 7,
+    "top_improvements": ["Lead with the outcome", "Cut the jargon", "Add one concrete number"],
+    "summary": "Clear enough, but generic.",
+}
+
+
+def _documents(n: int) -> list[str]:
+    return [f"Document {i}: our product helps teams ship faster by automating release notes." for i in range(n)]
+
+
+async def _warm_cache(cache_path: str, documents: list[str]):
+    sys.path.insert(0, str(ROOT))
+    os.environ["HONEYPOT_CACHE_DB_PATH"] = cache_path
+    os.environ["HONEYPOT_NEARDUP"] = "0"
+    import llm_client
+    import server
+
+    answer = json.dumps(SCORE)
+
+    async def generate(prompt, **kwargs):
+        return answer
+
+    llm_client.generate = generate
+    for document in documents:
+        await server._score_content({"content": document})
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(client: httpx.AsyncClient, url: str, proc: subprocess.Popen):
+    for _ in range(200):
+        if proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            if (await client.get(url + "/stats")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def _drive(url: str, documents: list[str], requests: int, concurrency: int) -> dict:
+    latencies = []
+    failures = 0
+    counter = iter(range(requests))
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal failures
+        for i in counter:
+            body = {
+                "jsonrpc": "2.0",
+                "id": i,
+                "method": "tools/call",
+                "params": {"name": "score_content", "arguments": {"content": documents[i % len(documents)]}},
+            }
+            started = time.perf_counter()
+            response = await client.post(
+                url + "/mcp/", json=body,
+                headers={"Accept": "application/json, text/event-stream"},
+            )
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200 or '"isError":true' in response.text or "Content Score" not in response.text:
+                failures += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": requests,
+        "failures": failures,
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+    }
+
+
+def _free_tier_holds(db_path: str) -> bool:
+    sys.path.insert(0, str(ROOT))
+    from analytics import FREE_TIER_LIMIT
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT COUNT(*), SUM(would_have_charged) FROM calls GROUP BY caller_id").fetchall()
+    finally:
+        conn.close()
+    return all(charged == max(0, calls - FREE_TIER_LIMIT) for calls, charged in rows)
+
+
+async def run(workers: int, backend: str, cache_path: str, documents: list[str], requests: int, concurrency: int) -> dict:
+    scratch = Path(tempfile.mkdtemp())
+    db_path = str(scratch / "honeypot.db")
+    port = _free_port()
+    env = {
+        **os.environ,
+        "PORT": str(port),
+        "HOST": "127.0.0.1",
+        "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "unused"),
+        "HONEYPOT_DB_PATH": db_path,
+        "HONEYPOT_CACHE_DB_PATH": cache_path,
+        "HONEYPOT_NEARDUP": "0",
+        "HONEYPOT_RATE_LIMIT": "1000000",
+        "HONEYPOT_DAILY_CAP": "1000000000",
+        "HONEYPOT_RATE_LIMIT_BACKEND": backend,
+        "HONEYPOT_COUNTER_BACKEND": backend,
+    }
+    proc = subprocess.Popen(
+        [sys.executable, str(ROOT / "server.py"), "--http", "--workers", str(workers)],
+        env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient() as client:
+            await _wait_ready(client, url, proc)
+        result = await _drive(url, documents, requests, concurrency)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    result.update(workers=workers, free_tier_holds=_free_tier_holds(db_path))
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--backend", choices=["sqlite", "memory"], default="sqlite",
+                        help="rate limit and counter backend for the workers")
+    args = parser.parse_args()
+
+    documents = _documents(args.documents)
+    cache_path = str(Path(tempfile.mkdtemp()) / "responses.db")
+    await _warm_cache(cache_path, documents)
+
+    print(f"{os.cpu_count()} CPUs, {args.requests} requests at concurrency {args.concurrency}")
+    print(f"{'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'failed':>7} {'free tier':>9}")
+    baseline = None
+    for workers in args.workers:
+        r = await run(workers, args.backend, cache_path, documents, args.requests, args.concurrency)
+        baseline = baseline or r["rps"]
+        print(f"{workers:>7} {r['rps']:>8.0f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['failures']:>7} "
+              f"{'ok' if r['free_tier_holds'] else 'BROKEN':>9}  ({r['rps'] / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
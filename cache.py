@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import metrics
+
+CACHE_ENABLED = os.environ.get("HONEYPOT_CACHE", "1") != "0"
+CACHE_MAX_ENTRIES = int(os.environ.get("HONEYPOT_CACHE_MAX_ENTRIES", "1024"))
+# Set to a file path to keep responses across restarts; empty keeps the cache in memory only.
+CACHE_DB_PATH = os.environ.get("HONEYPOT_CACHE_DB_PATH", "")
+
+# Seconds a response stays valid, by tool or (tool, mode). deep_research is
+# web-grounded so it goes stale quickly; explaining a fixed piece of code does not.
+TTLS = {
+    "red_team_attack": 24 * 3600,
+    "score_content": 24 * 3600,
+    "score_content_batch": 24 * 3600,
+    "deep_research": 15 * 60,
+    "verse_assist": 6 * 3600,
+    ("verse_assist", "explain"): 7 * 24 * 3600,
+}
+DEFAULT_TTL = 3600
+
+
+def ttl_for(tool: str, mode: str | None = None) -> float:
+    return TTLS.get((tool, mode), TTLS.get(tool, DEFAULT_TTL))
+
+
+def _normalize_text(text: str) -> str:
+    # Only used for keys: blank lines and trailing whitespace never change the answer.
+    return "\n".join(line for line in map(str.rstrip, text.splitlines()) if line)
+
+
+# Normalized, encoded form of short prompt parts, which are mostly template
+# literals repeated on every call. Bounded; cleared when full.
+_short_parts = {}
+_SHORT_PART_CHARS = 256
+_SHORT_PARTS_MAX = 4096
+
+
+def _part_bytes(part: str) -> bytes:
+    if len(part) > _SHORT_PART_CHARS:
+        return _normalize_text(part).encode()
+    data = _short_parts.get(part)
+    if data is None:
+        if len(_short_parts) >= _SHORT_PARTS_MAX:
+            _short_parts.clear()
+        data = _short_parts[part] = _normalize_text(part).encode()
+    return data
+
+
+def _normalize(value, seen: dict | None = None):
+    """``seen``, if given, collects id(original) -> visit order for every
+    string, so make_key can recognise prompt parts that are argument strings."""
+    if isinstance(value, str):
+        if seen is not None:
+            seen.setdefault(id(value), len(seen))
+        return _normalize_text(value)
+    if isinstance(value, dict):
+        return {k: _normalize(v, seen) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize(v, seen) for v in value]
+    return value
+
+
+def make_key(tool: str, arguments: dict, prompt: str | list[str], system: str = "") -> str:
+    """``prompt`` is text or a list of parts (templates.Template.parts); parts
+    are hashed in order without joining them. A part that is one of the
+    argument strings (the document) is hashed once, as an argument."""
+    seen = {}
+    h = hashlib.sha256(tool.encode())
+    h.update(b"\0")
+    h.update(json.dumps(_normalize(arguments, seen), sort_keys=True).encode())
+    h.update(b"\0")
+    h.update(hashlib.sha256(system.encode()).digest())
+    prompt_hash = hashlib.sha256()
+    for part in ((prompt,) if isinstance(prompt, str) else prompt):
+        index = seen.get(id(part))
+        if index is not None:
+            # Already in the key through the arguments; refer to it by position.
+            prompt_hash.update(b"\1%d\0" % index)
+        else:
+            prompt_hash.update(_part_bytes(part))
+            prompt_hash.update(b"\0")
+    h.update(prompt_hash.digest())
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """Two-tier response cache: an in-memory LRU in front of an optional SQLite file."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, db_path: str = CACHE_DB_PATH):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {}
+        if db_path:
+            conn = self._conn()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    tool TEXT NOT NULL,
+                    expires REAL NOT NULL,
+                    value TEXT NOT NULL
+                )
+            """)
+            conn.execute("DELETE FROM responses WHERE expires < ?", (time.time(),))
+            conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _count(self, tool: str, outcome: str):
+        counts = self._stats.setdefault(tool, {"memory_hits": 0, "disk_hits": 0, "misses": 0})
+        counts[outcome] += 1
+
+    def _remember(self, key: str, expires: float, value: str):
+        with self._lock:
+            self._memory[key] = (expires, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str, now: float):
+        return self._conn().execute(
+            "SELECT expires, value FROM responses WHERE key = ? AND expires >= ?", (key, now)
+        ).fetchone()
+
+    def _disk_put(self, key: str, tool: str, expires: float, value: str):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, tool, expires, value) VALUES (?, ?, ?, ?)",
+            (key, tool, expires, value),
+        )
+        conn.commit()
+
+    async def get(self, tool: str, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] >= now:
+                    self._memory.move_to_end(key)
+                    self._count(tool, "memory_hits")
+                    return entry[1]
+                del self._memory[key]
+        if self.db_path:
+            row = await asyncio.to_thread(self._disk_get, key, now)
+            if row is not None:
+                self._remember(key, row[0], row[1])
+                self._count(tool, "disk_hits")
+                return row[1]
+        self._count(tool, "misses")
+        return None
+
+    async def put(self, tool: str, key: str, value: str, ttl: float):
+        expires = time.time() + ttl
+        self._remember(key, expires, value)
+        if self.db_path:
+            await asyncio.to_thread(self._disk_put, key, tool, expires, value)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._memory)
+        return {"entries": entries, "tools": {tool: dict(c) for tool, c in self._stats.items()}}
+
+
+_cache = ResponseCache() if CACHE_ENABLED else None
+
+
+async def fetch(
+    tool: str,
+    mode: str | None,
+    arguments: dict,
+    prompt: str | list[str],
+    produce,
+    system: str = "",
+    accept=None,
+):
+    """Return the cached response for this tool call, or await produce() and cache it.
+
+    ``accept``, if given, must return True for a fresh response to be stored.
+    """
+    if _cache is None:
+        return await produce()
+    key = make_key(tool, arguments, prompt, system)
+    value = await _cache.get(tool, key)
+    if value is not None:
+        return value
+    value = await produce()
+    if value and (accept is None or accept(value)):
+        await _cache.put(tool, key, value, ttl_for(tool, mode))
+    return value
+
+
+async def fetch_many(
+    tool: str,
+    mode: str | None,
+    arguments: dict,
+    prompts: list,
+    produce,
+    system: str = "",
+    accept=None,
+) -> list:
+    """fetch() for several prompts that share arguments and system.
+
+    Cached responses are looked up per prompt; ``produce(missing_prompts)`` is
+    awaited once for the rest and must return one result per prompt, with
+    exceptions in place. Exceptions are returned as results and not cached.
+    """
+    if _cache is None:
+        return list(await produce(prompts))
+    keys = [make_key(tool, arguments, prompt, system) for prompt in prompts]
+    results = [await _cache.get(tool, key) for key in keys]
+    missing = [i for i, value in enumerate(results) if value is None]
+    if missing:
+        fresh = await produce([prompts[i] for i in missing])
+        for i, value in zip(missing, fresh):
+            results[i] = value
+            if isinstance(value, str) and value and (accept is None or accept(value)):
+                await _cache.put(tool, keys[i], value, ttl_for(tool, mode))
+    return results
+
+
+def stats() -> dict:
+    if _cache is None:
+        return {"entries": 0, "tools": {}}
+    return _cache.stats()
+
+
+def _collect_metrics():
+    report = stats()
+    yield "honeypot_cache_entries", "gauge", "Responses held in the in-memory cache", [({}, report["entries"])]
+    yield "honeypot_cache_lookups_total", "counter", "Response cache lookups by outcome", [
+        ({"tool": tool, "outcome": outcome}, n)
+        for tool, counts in report["tools"].items()
+        for outcome, n in counts.items()
+    ]
+
+
+metrics.add_collector(_collect_metrics)
@@ -0,0 +1,121 @@
+"""Splitting documents too long for one prompt into sections.
+
+Chunks follow the document's own structure: Markdown headings start
+sections, sections split at blank lines, paragraphs at sentence ends, and
+only a single overlong sentence is cut at a word boundary. Short neighbouring
+sections are merged so a document of many small headings does not turn into
+a call per heading.
+
+Boundaries depend only on nearby text, so editing one section leaves the
+other chunks byte-for-byte the same, and their cached analyses are reused
+(see server._map_chunks).
+"""
+import os
+import re
+
+# Target size of a chunk; chunks never exceed it.
+CHUNK_CHARS = int(os.environ.get("HONEYPOT_CHUNK_CHARS", "6000"))
+
+_HEADING = re.compile(r"^ {0,3}#{1,6}[ \t]+\S.*$", re.MULTILINE)
+_BLANK_LINES = re.compile(r"\n[ \t]*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class Chunk:
+    """One section of a document: its text and the heading it falls under
+    ("" before the first heading)."""
+
+    __slots__ = ("index", "heading", "text")
+
+    def __init__(self, index: int, heading: str, text: str):
+        self.index = index
+        self.heading = heading
+        self.text = text
+
+    def __repr__(self):
+        return f"Chunk({self.index}, {self.heading!r}, {len(self.text)} chars)"
+
+
+def _sections(text: str) -> list[tuple[str, str]]:
+    """(heading, text) for the preamble and each headed section, in order."""
+    sections = []
+    start, heading = 0, ""
+    for match in _HEADING.finditer(text):
+        if match.start() > start:
+            sections.append((heading, text[start:match.start()]))
+        start, heading = match.start(), match.group().strip().lstrip("#").strip()
+    sections.append((heading, text[start:]))
+    return [(h, body) for h, body in sections if body.strip()]
+
+
+def _cut(text: str, max_chars: int) -> list[str]:
+    """Pieces of one overlong sentence, cut at the last space before the limit."""
+    pieces = []
+    while len(text) > max_chars:
+        at = text.rfind(" ", 0, max_chars)
+        if at <= 0:
+            at = max_chars
+        pieces.append(text[:at])
+        text = text[at:]
+    pieces.append(text)
+    return pieces
+
+
+def _blocks(text: str, max_chars: int) -> list[str]:
+    """Paragraphs of ``text``, with any longer than max_chars split into
+    sentences and pieces. Concatenated with "\\n\\n" they rebuild the text up
+    to whitespace."""
+    blocks = []
+    for paragraph in _BLANK_LINES.split(text):
+        if not paragraph.strip():
+            continue
+        if len(paragraph) <= max_chars:
+            blocks.append(paragraph)
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            blocks.extend(_cut(sentence, max_chars))
+    return blocks
+
+
+def _pack(blocks: list[str], max_chars: int) -> list[str]:
+    packed, current = [], ""
+    for block in blocks:
+        if current and len(current) + 2 + len(block) > max_chars:
+            packed.append(current)
+            current = ""
+        current = f"{current}\n\n{block}" if current else block
+    if current:
+        packed.append(current)
+    return packed
+
+
+def split(text: str, max_chars: int = CHUNK_CHARS) -> list[Chunk]:
+    """Chunks of at most ``max_chars`` covering ``text`` in order.
+
+    A section that fits is one chunk, merged with following sections while
+    the chunk is under half of max_chars and the next one still fits. A
+    longer section is packed paragraph by paragraph into chunks of its own.
+    """
+    min_chars = max_chars // 2
+    chunks: list[tuple[str, str]] = []
+    open_chunk = None  # (heading, text) still accepting small sections
+    for heading, body in _sections(text):
+        body = body.strip()
+        if len(body) > max_chars:
+            if open_chunk:
+                chunks.append(open_chunk)
+                open_chunk = None
+            chunks.extend((heading, piece) for piece in _pack(_blocks(body, max_chars), max_chars))
+            continue
+        if open_chunk and len(open_chunk[1]) + 2 + len(body) <= max_chars:
+            open_chunk = (open_chunk[0], f"{open_chunk[1]}\n\n{body}")
+        else:
+            if open_chunk:
+                chunks.append(open_chunk)
+            open_chunk = (heading, body)
+        if len(open_chunk[1]) >= min_chars:
+            chunks.append(open_chunk)
+            open_chunk = None
+    if open_chunk:
+        chunks.append(open_chunk)
+    return [Chunk(i, heading, body) for i, (heading, body) in enumerate(chunks)]
@@ -0,0 +1,126 @@
+"""Caller identity for rate limits and the free tier.
+
+A caller is whoever holds the connection, not whatever they send: the client
+address over HTTP, otherwise (stdio) the MCP client named in the initialize
+handshake. An API key or bearer token header is used instead of the address
+only when HONEYPOT_CALLER_HEADERS names it, since this server does not verify
+keys and a client could otherwise mint a new identity per request.
+Only a call with no request context at all (direct calls from scripts and
+benchmarks) falls back to a fingerprint of its arguments.
+
+Raw keys and addresses never leave this module; callers are identified by
+analytics.hash_caller() of "<source>:<value>".
+"""
+import hashlib
+import os
+
+import analytics
+
+# Request headers that identify a caller, checked in order. Off by default:
+# only set them behind a gateway that rejects unknown keys.
+CALLER_HEADERS = [
+    h.strip().lower()
+    for h in os.environ.get("HONEYPOT_CALLER_HEADERS", "").split(",")
+    if h.strip()
+]
+# Use the first X-Forwarded-For address instead of the socket peer. Only
+# safe behind a proxy that sets the header itself.
+TRUST_PROXY = os.environ.get("HONEYPOT_TRUST_PROXY", "0") == "1"
+
+
+class Caller:
+    """Who made a call, and how large its arguments were."""
+
+    __slots__ = ("id", "source", "input_size")
+
+    def __init__(self, id: str, source: str, input_size: int):
+        self.id = id
+        self.source = source
+        self.input_size = input_size
+
+
+def _walk(value, digest) -> int:
+    """Characters in ``value``, feeding them to ``digest`` when given.
+
+    Dict keys are visited sorted so equal arguments fingerprint equally
+    whatever order the client sent them in.
+    """
+    if isinstance(value, str):
+        if digest is not None:
+            digest.update(value.encode("utf-8", "surrogatepass"))
+            digest.update(b"\x00")
+        return len(value)
+    if isinstance(value, dict):
+        size = 0
+        for key in sorted(value, key=str):
+            key_text = str(key)
+            if digest is not None:
+                digest.update(key_text.encode("utf-8", "surrogatepass"))
+                digest.update(b"\x01")
+            size += len(key_text) + _walk(value[key], digest)
+        return size
+    if isinstance(value, (list, tuple)):
+        if digest is not None:
+            digest.update(b"\x02")
+        size = sum(_walk(item, digest) for item in value)
+        if digest is not None:
+            digest.update(b"\x03")
+        return size
+    text = repr(value)
+    if digest is not None:
+        digest.update(text.encode())
+    return len(text)
+
+
+def measure(arguments: dict, fingerprint: bool = True) -> tuple[int, str | None]:
+    """Total characters of all keys and values in ``arguments``, and a
+    fingerprint of their content, from one walk.
+
+    Replaces json.dumps + len + SHA-256 of the dump, which copied and escaped
+    every document twice per call.
+    """
+    digest = hashlib.sha256() if fingerprint else None
+    size = _walk(arguments, digest)
+    return size, (digest.hexdigest()[:16] if digest is not None else None)
+
+
+def _from_http(request) -> tuple[str, str] | None:
+    headers = request.headers
+    for name in CALLER_HEADERS:
+        value = headers.get(name)
+        if value:
+            return f"header:{name}", value
+    if TRUST_PROXY:
+        forwarded = headers.get("x-forwarded-for")
+        if forwarded:
+            return "ip", forwarded.split(",", 1)[0].strip()
+    if request.client is not None:
+        return "ip", request.client.host
+    return None
+
+
+def _from_session(session) -> tuple[str, str] | None:
+    params = getattr(session, "client_params", None)
+    if params is None:
+        return None
+    info = params.clientInfo
+    return "client", f"{info.name}/{info.version}"
+
+
+def identify(arguments: dict, ctx=None) -> Caller:
+    """The caller of the current request. ``ctx`` is the MCP request context,
+    or None outside a request."""
+    found = None
+    if ctx is not None:
+        request = getattr(ctx, "request", None)
+        if request is not None and hasattr(request, "headers"):
+            found = _from_http(request)
+        if found is None:
+            found = _from_session(ctx.session)
+
+    if found is None:
+        size, fingerprint = measure(arguments)
+        return Caller(analytics.hash_caller(f"payload:{fingerprint}"), "payload", size)
+    size, _ = measure(arguments, fingerprint=False)
+    source, value = found
+    return Caller(analytics.hash_caller(f"{source}:{value}"), source, size)
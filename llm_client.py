@@ -1,52 +1,600 @@
 import os
+import sys
+import json
+import time
 import asyncio
-from google import genai
-from google.genai import types
+import hashlib
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+import httpx
+
+import batch
+import metrics
+import routing
+import templates
+from retry import LatencyTracker, Retrier, RetryBudget, backoff_delay
+from scheduler import AdaptiveScheduler
+
+logger = logging.getLogger(__name__)
+
+MAX_CONNECTIONS = int(os.environ.get("GEMINI_MAX_CONNECTIONS", "256"))
+KEEPALIVE_EXPIRY = float(os.environ.get("GEMINI_KEEPALIVE_SECONDS", "60"))
+# Point at another Gemini-compatible endpoint, e.g. benchmarks/fake_gemini.py.
+BASE_URL = os.environ.get("GEMINI_BASE_URL") or None
+CONTEXT_CACHE_ENABLED = os.environ.get("GEMINI_CONTEXT_CACHE", "1") != "0"
+CONTEXT_CACHE_TTL = int(os.environ.get("GEMINI_CONTEXT_CACHE_TTL", "3600"))
+MAX_CONCURRENCY = int(os.environ.get("GEMINI_MAX_CONCURRENCY", str(MAX_CONNECTIONS)))
+INITIAL_CONCURRENCY = int(os.environ.get("GEMINI_INITIAL_CONCURRENCY", "16"))
+# Share of a call's timeout it may spend queued before giving up, leaving
+# the rest for the upstream request itself.
+QUEUE_TIMEOUT_SHARE = float(os.environ.get("GEMINI_QUEUE_TIMEOUT_SHARE", "0.5"))
+# Lower runs first when calls are queued.
+PRIORITIES = {
+    "score_content": 0,
+    "verse_assist": 1,
+    "red_team_attack": 1,
+    "score_content_batch": 2,
+    "red_team_attack_batch": 2,
+    "deep_research": 3,
+}
+DEFAULT_PRIORITY = 1
+MAX_ATTEMPTS = int(os.environ.get("GEMINI_MAX_ATTEMPTS", "3"))
+# Retries and hedges allowed on top of normal traffic, as a share of calls.
+RETRY_BUDGET = float(os.environ.get("GEMINI_RETRY_BUDGET", "0.1"))
+HEDGE_ENABLED = os.environ.get("GEMINI_HEDGE", "0") == "1"
+HEDGE_QUANTILE = float(os.environ.get("GEMINI_HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_DELAY = float(os.environ.get("GEMINI_HEDGE_MIN_SECONDS", "1.0"))
+
+# google.genai takes longer to import than everything else in the server
+# together, so it is imported when the client is built (by prewarm() right
+# after a session starts, or by the first call) rather than at import.
+PREWARM = os.environ.get("HONEYPOT_PREWARM", "1") != "0"
+_DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/"
 
 _client = None
+_http = None
+_client_lock = threading.Lock()
+_prewarm_task = None
+_warming = None  # the worker thread's part of a prewarm
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
 
 def _get_client():
-    global _client
     if _client is None:
-        key = os.environ.get("GEMINI_API_KEY")
-        if not key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
-        _client = genai.Client(api_key=key)
+        # prewarm() may be building it in a worker thread.
+        with _client_lock:
+            if _client is None:
+                _build_client()
     return _client
 
-async def generate(prompt: str, timeout: float = 60.0) -> str:
-    client = _get_client()
-
-    def _sync():
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt,
-        )
-        return response.text
+def _build_client():
+    global _client, _http
+    key = os.environ.get("GEMINI_API_KEY")
+    if not key:
+        raise ValueError("GEMINI_API_KEY environment variable not set")
+    from google import genai
+    from google.genai import types
 
-    return await asyncio.wait_for(
-        asyncio.get_event_loop().run_in_executor(None, _sync),
-        timeout=timeout,
+    # One pooled keep-alive client shared by every request; the SDK's async
+    # interface runs on it directly, so no executor threads are involved and
+    # cancelling the awaiting task aborts the HTTP request.
+    _http = httpx.AsyncClient(
+        http2=_http2_available(),
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+    )
+    _client = genai.Client(
+        api_key=key,
+        http_options=types.HttpOptions(base_url=BASE_URL, httpx_async_client=_http),
     )
 
-async def generate_parallel(prompts: list[str], timeout: float = 60.0) -> list[str]:
-    tasks = [generate(p, timeout=timeout) for p in prompts]
-    return await asyncio.gather(*tasks, return_exceptions=True)
+def _warm_sdk():
+    from google.genai import types
+
+    _get_client()
+    # The SDK's pydantic models finish building their schemas on first use,
+    # tens of milliseconds for the larger ones; do it for those every call uses.
+    warm = [
+        types.GenerateContentConfig, types.GenerateContentResponse, types.Candidate, types.Content,
+        types.Part, types.UserContent, types.GenerateContentResponseUsageMetadata, types.HttpResponse,
+    ]
+    if CONTEXT_CACHE_ENABLED:
+        warm.append(types.CreateCachedContentConfig)
+    for model in warm:
+        model.model_rebuild()
+
+async def _prewarm(warming: asyncio.Future):
+    started = time.perf_counter()
+    await warming
+    try:
+        # Any response will do: it leaves a TCP (and TLS) connection in the pool.
+        await _http.head(BASE_URL or _DEFAULT_BASE_URL, timeout=5.0)
+    except httpx.HTTPError as e:
+        logger.debug("Prewarm connection to Gemini failed: %s", e)
+    logger.debug("Gemini client prewarmed in %.0f ms", (time.perf_counter() - started) * 1000)
+
+def prewarm() -> asyncio.Task | None:
+    """Start building the Gemini client and opening its connection in the
+    background, once per client. None when disabled or with no API key."""
+    global _prewarm_task, _warming
+    if not PREWARM or _client is not None or not os.environ.get("GEMINI_API_KEY"):
+        return None
+    if _prewarm_task is None or _prewarm_task.done():
+        # Importing the SDK and building the client (httpx loads its
+        # transport and an SSL context) take a few hundred ms of CPU, so they
+        # run in a thread and the event loop keeps answering meanwhile.
+        _warming = asyncio.ensure_future(asyncio.to_thread(_warm_sdk))
+        _prewarm_task = asyncio.create_task(_prewarm(_warming))
+        _prewarm_task.add_done_callback(_prewarm_done)
+    return _prewarm_task
+
+def _prewarm_done(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Gemini prewarm failed: %s", task.exception())
+
+async def _ready_client():
+    """_get_client() for coroutines: while a prewarm is building the client,
+    wait for it without blocking the event loop on the import and client locks."""
+    if _client is None and _warming is not None and not _warming.done():
+        try:
+            await asyncio.shield(_warming)
+        except Exception:
+            pass  # _get_client() below raises the real error, or retries
+    return _get_client()
+
+def _api_error_code(exc: BaseException) -> int | None:
+    # Only a loaded SDK can have raised one of its errors.
+    errors = sys.modules.get("google.genai.errors")
+    if errors is not None and isinstance(exc, errors.APIError):
+        return exc.code
+    return None
+
+async def aclose():
+    global _client, _http, _prewarm_task, _warming
+    if _prewarm_task is not None:
+        _prewarm_task.cancel()
+        _prewarm_task = None
+    if _warming is not None:
+        # The thread cannot be stopped; let it finish before closing what it built.
+        await asyncio.gather(_warming, return_exceptions=True)
+        _warming = None
+    for entry in _context_caches.values():
+        if entry.task is not None:
+            entry.task.cancel()
+        if entry.name and _client is not None:
+            try:
+                await _client.aio.caches.delete(name=entry.name)
+            except Exception:
+                pass
+    _context_caches.clear()
+    if _http is not None:
+        await _http.aclose()
+    _client = None
+    _http = None
+
+def _is_overload(exc: BaseException) -> bool:
+    code = _api_error_code(exc)
+    if code is not None:
+        return code == 429 or code >= 500
+    return isinstance(exc, httpx.TimeoutException)
+
+_scheduler = AdaptiveScheduler(
+    initial=min(INITIAL_CONCURRENCY, MAX_CONCURRENCY),
+    max_limit=MAX_CONCURRENCY,
+    is_overload=_is_overload,
+    on_wait=lambda tool, seconds: metrics.QUEUE_WAIT_SECONDS.observe(tool, value=seconds),
+)
+
+def _slot(tool: str | None, timeout: float):
+    tool = tool or "other"
+    deadline = time.monotonic() + timeout * QUEUE_TIMEOUT_SHARE
+    return _scheduler.slot(tool, PRIORITIES.get(tool, DEFAULT_PRIORITY), deadline)
+
+def scheduler_stats() -> dict:
+    return {**_scheduler.stats(), **_retrier.stats()}
+
+_TRANSIENT_CODES = {429, 500, 502, 503, 504}
+
+def _is_transient(exc: BaseException) -> bool:
+    code = _api_error_code(exc)
+    if code is not None:
+        return code in _TRANSIENT_CODES
+    return isinstance(exc, httpx.TransportError)
+
+_retrier = Retrier(RetryBudget(ratio=RETRY_BUDGET), max_attempts=MAX_ATTEMPTS)
+_latency = LatencyTracker()
+
+_router = routing.load_router()
+
+def route_stats() -> dict:
+    return _router.stats()
+
+class CallUsage:
+    """Upstream routes, models, time and cost spent on behalf of one tool call."""
+
+    __slots__ = ("routes", "models", "upstream_ms", "cost_usd")
+
+    def __init__(self):
+        self.routes = set()
+        self.models = set()
+        self.upstream_ms = 0
+        self.cost_usd = 0.0
+
+    def add(self, route: str, model: str, seconds: float, cost: float):
+        self.routes.add(route)
+        self.models.add(model)
+        self.upstream_ms += int(seconds * 1000)
+        self.cost_usd += cost
+
+    @property
+    def route(self) -> str | None:
+        return ",".join(sorted(self.routes)) or None
+
+    @property
+    def model(self) -> str | None:
+        return ",".join(sorted(self.models)) or None
+
+_call_usage = contextvars.ContextVar("call_usage", default=None)
+
+@contextmanager
+def track_usage():
+    """Collect the upstream usage of every Gemini call made inside the block.
+
+    Coalesced and cached answers are attributed only to the call that
+    actually reached Gemini.
+    """
+    usage = CallUsage()
+    token = _call_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _call_usage.reset(token)
+
+def _route_succeeded(route: routing.Route, model: str, usage, seconds: float):
+    metrics.UPSTREAM_SECONDS.observe(route.name, model, "ok", value=seconds)
+    cost = _router.cost(model, usage)
+    _router.record_success(route, model, seconds, cost)
+    tracker = _call_usage.get()
+    if tracker is not None:
+        tracker.add(route.name, model, seconds, cost)
+
+def _route_failed(route: routing.Route, model: str, exc: BaseException, seconds: float):
+    metrics.UPSTREAM_SECONDS.observe(route.name, model, type(exc).__name__, value=seconds)
+    if _is_overload(exc):
+        _router.record_overload(route, model)
+
+def _collect_metrics():
+    stats = scheduler_stats()
+    yield "honeypot_gemini_concurrency_limit", "gauge", "Current adaptive concurrency limit", [({}, stats["limit"])]
+    yield "honeypot_gemini_in_flight", "gauge", "Gemini requests in flight", [({}, stats["in_flight"])]
+    yield "honeypot_gemini_queued", "gauge", "Gemini calls waiting for a slot", [
+        ({"tool": tool}, n) for tool, n in stats["queued"].items()
+    ]
+    for key in ("expired", "overloads", "retries", "hedges", "hedge_wins", "budget_exhausted"):
+        yield f"honeypot_gemini_{key}_total", "counter", f"Gemini calls: {key.replace('_', ' ')}", [({}, stats[key])]
+
+metrics.add_collector(_collect_metrics)
+
+def _hedge_delay(tool: str | None) -> float | None:
+    if not HEDGE_ENABLED:
+        return None
+    p = _latency.quantile(tool or "other", HEDGE_QUANTILE)
+    return None if p is None else max(p, HEDGE_MIN_DELAY)
+
+async def _resilient(tool: str | None, attempt, on_chunk):
+    if on_chunk is None:
+        return await _retrier.run(attempt, _is_transient, hedge_after=_hedge_delay(tool))
+    # Once text has been streamed to the caller a retry would repeat it, so
+    # only failures before the first chunk are retried, and there is no hedging.
+    streamed = False
+
+    async def forward(text):
+        nonlocal streamed
+        streamed = True
+        await on_chunk(text)
+
+    return await _retrier.run(lambda: attempt(forward), lambda e: not streamed and _is_transient(e))
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+# Upstream calls currently in flight, keyed on model, config and prompt, so
+# identical concurrent requests share a single Gemini round-trip.
+_inflight = {}
+
+def _flight_key(model: str, config_tag: str, contents: str | list[str]) -> str:
+    h = hashlib.sha256(f"{model}\0{config_tag}\0".encode())
+    if isinstance(contents, str):
+        h.update(contents.encode())
+    else:
+        for part in contents:
+            h.update(part.encode())
+            h.update(b"\0")
+    return h.hexdigest()
+
+def _forget(key: str, flight: _Flight):
+    if _inflight.get(key) is flight:
+        del _inflight[key]
+
+async def _single_flight(key: str, call, timeout: float):
+    flight = _inflight.get(key)
+    if flight is None:
+        flight = _inflight[key] = _Flight(asyncio.ensure_future(call()))
+        flight.task.add_done_callback(lambda _, key=key, flight=flight: _forget(key, flight))
+    flight.waiters += 1
+    try:
+        # shield() so one waiter timing out or being cancelled leaves the
+        # shared call running for the others.
+        return await asyncio.wait_for(asyncio.shield(flight.task), timeout=timeout)
+    finally:
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            _forget(key, flight)
+            flight.task.cancel()
+
+class _ContextCache:
+    __slots__ = ("name", "task", "used")
+
+    def __init__(self):
+        self.name = None
+        self.task = None
+        self.used = time.monotonic()
+
+# Static system prefixes registered with Gemini's cached-content API, keyed
+# on model and prefix. name stays None until registration succeeds, and for
+# good if the model rejects it (e.g. prefix below the minimum cacheable size),
+# in which case the prefix is sent inline as the system instruction. A
+# transient failure is retried with backoff, and a cache unused for a whole
+# TTL is deleted rather than refreshed; either way the next call registers
+# the prefix again.
+_context_caches = {}
+
+def _cached_content(model: str, system: str) -> str | None:
+    if not CONTEXT_CACHE_ENABLED:
+        return None
+    key = _flight_key(model, "system", system)
+    entry = _context_caches.get(key)
+    if entry is None:
+        entry = _context_caches[key] = _ContextCache()
+        entry.task = asyncio.ensure_future(_keep_context_cache(key, entry, model, system))
+    entry.used = time.monotonic()
+    return entry.name
+
+def _drop_context_cache(model: str, system: str):
+    entry = _context_caches.pop(_flight_key(model, "system", system), None)
+    if entry is not None and entry.task is not None:
+        entry.task.cancel()
+
+def _forget_context_cache(key: str, entry: _ContextCache):
+    if _context_caches.get(key) is entry:
+        del _context_caches[key]
+
+async def _keep_context_cache(key: str, entry: _ContextCache, model: str, system: str):
+    from google.genai import types
 
-async def research_with_grounding(query: str, timeout: float = 60.0) -> str:
     client = _get_client()
+    ttl = f"{CONTEXT_CACHE_TTL}s"
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            cached = await client.aio.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(system_instruction=system, ttl=ttl),
+            )
+            break
+        except Exception as e:
+            if not _is_transient(e):
+                logger.info("Context cache unavailable for %s, sending prefix inline: %s", model, e)
+                return
+            if attempt == MAX_ATTEMPTS:
+                logger.warning("Could not create context cache for %s, will retry on a later call: %s", model, e)
+                _forget_context_cache(key, entry)
+                return
+            await asyncio.sleep(backoff_delay(attempt, 1.0, 30.0))
+    entry.name = cached.name
+    failures = 0
+    while True:
+        await asyncio.sleep(CONTEXT_CACHE_TTL / 2 if not failures else backoff_delay(failures, 1.0, 30.0))
+        if time.monotonic() - entry.used >= CONTEXT_CACHE_TTL:
+            # No hits for a whole TTL: stop paying to keep it.
+            _forget_context_cache(key, entry)
+            try:
+                await client.aio.caches.delete(name=cached.name)
+            except Exception:
+                pass
+            return
+        try:
+            await client.aio.caches.update(
+                name=cached.name,
+                config=types.UpdateCachedContentConfig(ttl=ttl),
+            )
+            failures = 0
+        except Exception as e:
+            failures += 1
+            # The cache outlives a failed refresh by at least half its TTL,
+            # so transient errors get a few quick retries first.
+            if _is_transient(e) and failures < MAX_ATTEMPTS:
+                continue
+            logger.warning("Could not refresh context cache %s: %s", cached.name, e)
+            _forget_context_cache(key, entry)
+            return
+
+def _prefix_config(system: str | None, cache_name: str | None, **kwargs):
+    from google.genai import types
+
+    if cache_name:
+        return types.GenerateContentConfig(cached_content=cache_name, **kwargs)
+    return types.GenerateContentConfig(system_instruction=system, **kwargs)
 
-    def _sync():
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=query,
-            config=types.GenerateContentConfig(
-                tools=[types.Tool(google_search=types.GoogleSearch())],
-            ),
-        )
-        return response.text
-
-    return await asyncio.wait_for(
-        asyncio.get_event_loop().run_in_executor(None, _sync),
-        timeout=timeout,
+# Per tool and prefix mode ("context_cache", "inline" or "none"): call count,
+# total latency and token usage as reported by Gemini.
+_usage = {}
+
+def _record_usage(tool: str | None, prefix_mode: str, usage, seconds: float):
+    stats = _usage.setdefault((tool or "other", prefix_mode), {
+        "calls": 0, "latency_ms": 0.0, "prompt_tokens": 0, "cached_tokens": 0, "output_tokens": 0,
+    })
+    stats["calls"] += 1
+    stats["latency_ms"] += seconds * 1000
+    if usage is not None:
+        stats["prompt_tokens"] += usage.prompt_token_count or 0
+        stats["cached_tokens"] += usage.cached_content_token_count or 0
+        stats["output_tokens"] += usage.candidates_token_count or 0
+
+def usage_stats() -> dict:
+    report = {}
+    for (tool, prefix_mode), stats in _usage.items():
+        calls = stats["calls"]
+        report.setdefault(tool, {})[prefix_mode] = {
+            **stats,
+            "avg_latency_ms": round(stats["latency_ms"] / calls, 1),
+            "avg_prompt_tokens": round(stats["prompt_tokens"] / calls, 1),
+            "cached_token_share": round(stats["cached_tokens"] / stats["prompt_tokens"], 3) if stats["prompt_tokens"] else 0.0,
+        }
+    return report
+
+def reset_usage_stats():
+    _usage.clear()
+
+async def _request(client, model: str, contents, config, on_chunk):
+    if on_chunk is None:
+        response = await client.aio.models.generate_content(model=model, contents=contents, config=config)
+        return response.text, response.usage_metadata
+    parts = []
+    usage = None
+    async for chunk in await client.aio.models.generate_content_stream(model=model, contents=contents, config=config):
+        if chunk.usage_metadata is not None:
+            usage = chunk.usage_metadata
+        text = chunk.text
+        if text:
+            parts.append(text)
+            await on_chunk(text)
+    return "".join(parts), usage
+
+def _contents(prompt: str | list[str]) -> str:
+    # Prompt parts stay separate up to here, for keys and routing. The SDK
+    # builds and validates a pydantic Part per list element, which costs far
+    # more per request than one copy of the joined text, so they go upstream
+    # as a single text part.
+    return prompt if isinstance(prompt, str) else "".join(prompt)
+
+async def _generate_once(client, model: str, prompt: str | list[str], system: str | None, extra: dict, on_chunk):
+    from google.genai import errors
+
+    cache_name = _cached_content(model, system) if system else None
+    prompt = _contents(prompt)
+    try:
+        text, usage = await _request(client, model, prompt, _prefix_config(system, cache_name, **extra), on_chunk)
+    except errors.ClientError as e:
+        if cache_name is None or e.code == 429:
+            raise
+        # The cached prefix may have expired upstream; re-register it later
+        # and answer this request with the prefix inline.
+        _drop_context_cache(model, system)
+        cache_name = None
+        text, usage = await _request(client, model, prompt, _prefix_config(system, None, **extra), on_chunk)
+    return text, usage, cache_name
+
+async def generate(
+    prompt: str | list[str],
+    timeout: float = 60.0,
+    on_chunk=None,
+    system: str | None = None,
+    tool: str | None = None,
+    response_schema: dict | None = None,
+    mode: str | None = None,
+) -> str:
+    client = await _ready_client()
+    route = _router.route(tool, mode, templates.prompt_length(prompt))
+    extra = {}
+    if response_schema is not None:
+        extra = {"response_mime_type": "application/json", "response_schema": response_schema}
+
+    async def attempt(on_chunk=None):
+        async with _slot(tool, timeout):
+            # Picked per attempt, so a retry after an overload moves to the
+            # route's next model.
+            model = _router.pick(route)
+            started = time.perf_counter()
+            try:
+                with metrics.span("gemini.generate_content", tool=tool or "other", route=route.name, model=model):
+                    text, usage, cache_name = await _generate_once(client, model, prompt, system, extra, on_chunk)
+            except Exception as e:
+                _route_failed(route, model, e, time.perf_counter() - started)
+                raise
+        elapsed = time.perf_counter() - started
+        prefix_mode = "context_cache" if cache_name else ("inline" if system else "none")
+        _record_usage(tool, prefix_mode, usage, elapsed)
+        _route_succeeded(route, model, usage, elapsed)
+        _latency.record(tool or "other", elapsed)
+        return text
+
+    def call():
+        return _resilient(tool, attempt, on_chunk)
+
+    if on_chunk is not None:
+        # A streamed response belongs to one caller, so it is not coalesced.
+        return await asyncio.wait_for(call(), timeout=timeout)
+    config_tag = (system or "") + (json.dumps(response_schema, sort_keys=True) if response_schema else "")
+    return await _single_flight(_flight_key(route.name, config_tag, prompt), call, timeout)
+
+async def generate_parallel(
+    prompts: list[str | list[str]],
+    timeout: float = 60.0,
+    concurrency: int | None = None,
+    **kwargs,
+) -> list:
+    """generate() for every prompt, with at most ``concurrency`` of them
+    running at once (all when None). Further keyword arguments go to each
+    generate(). Results come back in order, exceptions in place."""
+    async def one(prompt):
+        return await generate(prompt, timeout=timeout, **kwargs)
+
+    if concurrency is None:
+        return await asyncio.gather(*(one(p) for p in prompts), return_exceptions=True)
+    return await batch.run_bounded(prompts, one, concurrency)
+
+async def research_with_grounding(query: str | list[str], timeout: float = 60.0, on_chunk=None, mode: str | None = None) -> str:
+    client = await _ready_client()
+    from google.genai import types
+
+    route = _router.route("deep_research", mode, templates.prompt_length(query))
+    config = types.GenerateContentConfig(
+        tools=[types.Tool(google_search=types.GoogleSearch())],
     )
+
+    async def attempt(on_chunk=None):
+        async with _slot("deep_research", timeout):
+            model = _router.pick(route)
+            started = time.perf_counter()
+            try:
+                with metrics.span("gemini.generate_content", tool="deep_research", route=route.name, model=model):
+                    text, usage = await _request(client, model, _contents(query), config, on_chunk)
+            except Exception as e:
+                _route_failed(route, model, e, time.perf_counter() - started)
+                raise
+        elapsed = time.perf_counter() - started
+        _record_usage("deep_research", "none", usage, elapsed)
+        _route_succeeded(route, model, usage, elapsed)
+        _latency.record("deep_research", elapsed)
+        return text
+
+    def call():
+        return _resilient("deep_research", attempt, on_chunk)
+
+    if on_chunk is not None:
+        return await asyncio.wait_for(call(), timeout=timeout)
+    return await _single_flight(_flight_key(route.name, "google_search", query), call, timeout)
@@ -0,0 +1,247 @@
+"""In-process metrics in Prometheus text format, and optional OpenTelemetry spans.
+
+Metrics are plain dicts of floats behind one lock per metric, so recording
+one costs about a microsecond. Values owned by other modules (scheduler
+limit, cache hit counts, ...) are read at scrape time by collectors
+registered with add_collector().
+
+Set HONEYPOT_METRICS=0 to turn recording off, and HONEYPOT_OTEL=1 to wrap
+every upstream Gemini call in an OpenTelemetry span. Spans need the
+opentelemetry-api package and an SDK configured by the host process.
+"""
+import asyncio
+import bisect
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+
+ENABLED = os.environ.get("HONEYPOT_METRICS", "1") != "0"
+OTEL_ENABLED = os.environ.get("HONEYPOT_OTEL", "0") == "1"
+# How often the event loop lag probe wakes up.
+LOOP_LAG_INTERVAL = float(os.environ.get("HONEYPOT_LOOP_LAG_INTERVAL", "0.1"))
+
+# Seconds; covers a sub-millisecond SQLite write up to the 60s tool timeout.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_metrics = []
+_collectors = []
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, *label_values, amount: float = 1.0):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for label_values, value in items:
+            yield self.name + _format_labels(self.labels, label_values), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *label_values, value: float):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[label_values] = value
+
+    def dec(self, *label_values, amount: float = 1.0):
+        self.inc(*label_values, amount=-amount)
+
+    @contextmanager
+    def track(self, *label_values):
+        """Count the body of the ``with`` as in progress."""
+        self.inc(*label_values)
+        try:
+            yield
+        finally:
+            self.dec(*label_values)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, *label_values, value: float):
+        if not ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(label_values)
+            if row is None:
+                row = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[index] += 1
+            row[-1] += value
+
+    def time(self, *label_values):
+        return _Timer(self, label_values)
+
+    def samples(self):
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        for label_values, row in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), row):
+                cumulative += count
+                yield self.name + "_bucket" + _format_labels(self.labels, label_values, f'le="{bound}"'), cumulative
+            yield self.name + "_count" + _format_labels(self.labels, label_values), cumulative
+            yield self.name + "_sum" + _format_labels(self.labels, label_values), row[-1]
+
+
+class _Timer:
+    # A plain class rather than @contextmanager: this runs several times per
+    # tool call and a generator-based context manager costs about 3x as much.
+    __slots__ = ("histogram", "label_values", "started")
+
+    def __init__(self, histogram: Histogram, label_values: tuple):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(*self.label_values, value=time.perf_counter() - self.started)
+
+
+def add_collector(collect):
+    """Register collect() -> iterable of (name, kind, help, [(labels dict, value)])."""
+    _collectors.append(collect)
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(f"{sample} {value}" for sample, value in metric.samples())
+    for collect in _collectors:
+        for name, kind, help, samples in collect():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                names = tuple(labels)
+                lines.append(f"{name}{_format_labels(names, tuple(labels[n] for n in names))} {value}")
+    return "\n".join(lines) + "\n"
+
+
+_tracer = None
+
+
+def _get_tracer():
+    global _tracer
+    if _tracer is None:
+        from opentelemetry import trace
+        _tracer = trace.get_tracer("honeypot-mcp")
+    return _tracer
+
+
+def span(name: str, **attributes):
+    """An OpenTelemetry span when HONEYPOT_OTEL=1, otherwise a no-op context."""
+    if not OTEL_ENABLED:
+        return nullcontext()
+    return _get_tracer().start_as_current_span(name, attributes=attributes)
+
+
+# Shared by the modules on the call_tool hot path.
+STAGE_SECONDS = Histogram(
+    "honeypot_stage_seconds",
+    "Time spent in each stage of a tool call",
+    ("stage",),
+)
+CALL_SECONDS = Histogram(
+    "honeypot_call_seconds",
+    "End-to-end tool call latency",
+    ("tool", "outcome"),
+)
+CALLS_IN_FLIGHT = Gauge(
+    "honeypot_calls_in_flight",
+    "Tool calls currently being handled",
+    ("tool",),
+)
+REJECTIONS = Counter(
+    "honeypot_rejections_total",
+    "Tool calls refused before running",
+    ("reason",),
+)
+UPSTREAM_SECONDS = Histogram(
+    "honeypot_upstream_seconds",
+    "Latency of individual Gemini requests",
+    ("route", "model", "outcome"),
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "honeypot_queue_wait_seconds",
+    "Time Gemini calls waited for a concurrency slot",
+    ("tool",),
+)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "honeypot_event_loop_lag_seconds",
+    "How late the event loop ran a timer; high values mean blocking work on the loop",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+
+def stage(name: str):
+    """Time the body of a ``with`` under honeypot_stage_seconds{stage=name}."""
+    return STAGE_SECONDS.time(name) if ENABLED else nullcontext()
+
+
+@asynccontextmanager
+async def watch_event_loop(interval: float = LOOP_LAG_INTERVAL):
+    """Sample event loop lag into honeypot_event_loop_lag_seconds while inside the ``async with``."""
+    if not ENABLED or interval <= 0:
+        yield
+        return
+
+    async def probe():
+        while True:
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            EVENT_LOOP_LAG_SECONDS.observe(value=max(0.0, time.perf_counter() - expected))
+
+    task = asyncio.create_task(probe())
+    try:
+        yield
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
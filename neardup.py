@@ -0,0 +1,415 @@
+"""Finding earlier results for lightly edited resubmissions.
+
+An agent revising a draft sends versions that differ by a few words, which
+the response cache (keyed on the exact text) never matches. This index keeps
+a MinHash signature of each document a tool analyzed, in a SQLite file next
+to the analytics database, and finds one above NEARDUP_THRESHOLD estimated
+similarity sent by the same caller with the same options. Callers never see
+each other's documents or results: the caller is part of the scope every
+lookup is confined to.
+
+Signatures are one-permutation MinHash over word 4-gram shingles: 64 bins,
+each keeping the smallest shingle hash that falls into it, so a signature
+costs one pass over the words. Jaccard similarity is estimated as the share
+of bins two signatures agree on. Lookups go through LSH: the signature is cut
+into 16 bands of 4 bins, and a document is a candidate if any band matches
+exactly. A document at 0.85 similarity fails to become a candidate about once
+in 100,000 lookups; one at 0.5 is a candidate about 65% of the time and is
+then rejected on its full signature. With 64 bins the estimate itself is off
+by about 0.04 near the threshold, so documents right at it may go either way.
+
+A 4-gram changes with any of its words, so each edited word costs up to four
+shingles: three edits in a 300-word document leave it about 0.92 similar.
+
+Similarity is over sets of shingles, so a paragraph repeated 400 times is as
+similar to the paragraph as the paragraph itself. A candidate therefore also
+has to be within MAX_LENGTH_RATIO of the document's word count. Documents
+with fewer than MIN_SHINGLES shingles (short or wordless input) are neither
+stored nor looked up: their signatures are mostly empty bins and would
+match anything just as short.
+
+The index lives on disk and only the rows it touches are read, so memory
+does not grow with it. It keeps at most NEARDUP_MAX_ENTRIES documents,
+dropping the least recently matched first, and each tool's entries expire
+with its cache TTL.
+"""
+import os
+import re
+import json
+import time
+import zlib
+import array
+import asyncio
+import difflib
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+
+import analytics
+import cache
+import metrics
+
+NEARDUP_ENABLED = os.environ.get("HONEYPOT_NEARDUP", "1") != "0"
+NEARDUP_PATH = os.environ.get("HONEYPOT_NEARDUP_PATH", "") or str(Path(analytics.DB_PATH).with_name("neardup.db"))
+NEARDUP_THRESHOLD = float(os.environ.get("HONEYPOT_NEARDUP_THRESHOLD", "0.85"))
+NEARDUP_MAX_ENTRIES = int(os.environ.get("HONEYPOT_NEARDUP_MAX_ENTRIES", "20000"))
+
+BINS = 64
+BANDS = 16
+ROWS = BINS // BANDS
+SHINGLE_WORDS = 4
+# Candidates compared on their full signature per lookup, most recent first.
+MAX_CANDIDATES = 32
+MIN_SHINGLES = 16
+# Longest/shortest word count of two documents that may match; at the 0.85
+# threshold pure insertions cannot go past about 1.18.
+MAX_LENGTH_RATIO = 1.2
+# Bumped when the tables change; an index of another version is dropped.
+SCHEMA_VERSION = 2
+
+_WORD = re.compile(r"\w+")
+_MASK = (1 << 64) - 1
+_BIN_SHIFT = 64 - 6  # top 6 bits pick one of the 64 bins
+_VALUE_MASK = (1 << _BIN_SHIFT) - 1
+_EMPTY = 0xFFFFFFFF  # stored value of a bin no shingle fell into
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS documents (
+        id INTEGER PRIMARY KEY,
+        tool TEXT NOT NULL,
+        scope TEXT NOT NULL,
+        words INTEGER NOT NULL,
+        created REAL NOT NULL,
+        used REAL NOT NULL,
+        signature BLOB NOT NULL,
+        text BLOB NOT NULL,
+        result TEXT NOT NULL
+    )
+    """,
+    # One row per band of each document; the key already covers tool and scope.
+    """
+    CREATE TABLE IF NOT EXISTS bands (
+        key INTEGER NOT NULL,
+        doc INTEGER NOT NULL,
+        PRIMARY KEY (key, doc)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS documents_used ON documents (used)",
+)
+
+
+def _words(text: str) -> list[str]:
+    return _WORD.findall(text.lower())
+
+
+def signature(text: str) -> array.array:
+    """The 64-bin MinHash signature of ``text``, 32 bits per bin."""
+    return _signature(_words(text))
+
+
+def _signature(words: list[str]) -> array.array:
+    hashes = {}
+    word_hashes = [hashes.get(w) or hashes.setdefault(w, zlib.crc32(w.encode()) | 1) for w in words]
+    mins = [_VALUE_MASK] * BINS
+    if len(word_hashes) < SHINGLE_WORDS:
+        word_hashes += [0] * (SHINGLE_WORDS - len(word_hashes))
+    a, b, c = word_hashes[0], word_hashes[1], word_hashes[2]
+    for d in word_hashes[3:]:
+        # A 4-gram's hash from its words' hashes, then a multiply-xorshift
+        # finalizer so that the top bits (the bin) are well mixed.
+        h = (a * 0x9E3779B97F4A7C15 + b * 0xC2B2AE3D27D4EB4F + c * 0x165667B19E3779F9 + d) & _MASK
+        h ^= h >> 29
+        h = (h * 0xBF58476D1CE4E5B9) & _MASK
+        h ^= h >> 32
+        i = h >> _BIN_SHIFT
+        v = h & _VALUE_MASK
+        if v < mins[i]:
+            mins[i] = v
+        a, b, c = b, c, d
+    return array.array("I", [_EMPTY if v == _VALUE_MASK else v & 0xFFFFFFFE for v in mins])
+
+
+def similarity(first: array.array, second: array.array) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    agree = used = 0
+    for x, y in zip(first, second):
+        if x == _EMPTY and y == _EMPTY:
+            continue
+        used += 1
+        agree += x == y
+    return agree / used if used else 1.0
+
+
+def band_keys(tool: str, scope: str, sig: array.array) -> list[int]:
+    prefix = f"{tool}\0{scope}\0".encode()
+    data = sig.tobytes()
+    width = ROWS * sig.itemsize
+    return [
+        int.from_bytes(
+            hashlib.blake2b(prefix + bytes((band,)) + data[band * width:(band + 1) * width], digest_size=8).digest(),
+            "big", signed=True,
+        )
+        for band in range(BANDS)
+    ]
+
+
+def scope_of(caller: str, options: dict) -> str:
+    """Documents only match for the same caller (identity.Caller.id) under
+    the same options (attack type, domain, ...)."""
+    return json.dumps({"caller": caller, "options": options}, sort_keys=True)
+
+
+class Match:
+    """An earlier document similar to the one looked up, and its result."""
+
+    __slots__ = ("similarity", "created", "text", "result")
+
+    def __init__(self, similarity: float, created: float, text: str, result: str):
+        self.similarity = similarity
+        self.created = created
+        self.text = text
+        self.result = result
+
+    def __repr__(self):
+        return f"Match({self.similarity:.3f}, created={self.created:.0f})"
+
+
+class NearDupIndex:
+    """MinHash/LSH index of analyzed documents in a SQLite file."""
+
+    def __init__(self, db_path: str = NEARDUP_PATH, max_entries: int = NEARDUP_MAX_ENTRIES,
+                 threshold: float = NEARDUP_THRESHOLD):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {}
+        conn = self._conn()
+        with conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS documents")
+                conn.execute("DROP TABLE IF EXISTS bands")
+            for statement in SCHEMA:
+                conn.execute(statement)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._entries = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        self.expire()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def _count(self, tool: str, outcome: str):
+        with self._lock:
+            counts = self._stats.setdefault(tool, {"hits": 0, "misses": 0, "skipped": 0})
+            counts[outcome] += 1
+
+    def find(self, tool: str, scope: str, text: str, now: float | None = None) -> Match | None:
+        """The most similar live document above the threshold, of about the
+        same length, if any."""
+        words = _words(text)
+        if len(words) - SHINGLE_WORDS + 1 < MIN_SHINGLES:
+            self._count(tool, "skipped")
+            return None
+        sig = _signature(words)
+        now = time.time() if now is None else now
+        keys = band_keys(tool, scope, sig)
+        conn = self._conn()
+        rows = conn.execute(
+            f"""
+            SELECT id, created, signature FROM documents
+            WHERE id IN (SELECT doc FROM bands WHERE key IN ({",".join("?" * len(keys))}))
+              AND tool = ? AND scope = ? AND created >= ? AND words BETWEEN ? AND ?
+            ORDER BY id DESC LIMIT ?
+            """,
+            (
+                *keys, tool, scope, now - cache.ttl_for(tool),
+                len(words) / MAX_LENGTH_RATIO, len(words) * MAX_LENGTH_RATIO, MAX_CANDIDATES,
+            ),
+        ).fetchall()
+        best, best_score = None, self.threshold
+        for doc_id, created, blob in rows:
+            score = similarity(sig, array.array("I", blob))
+            # Ties go to the most recent document, which comes first.
+            if score > best_score or (best is None and score == best_score):
+                best, best_score = doc_id, score
+        if best is None:
+            self._count(tool, "misses")
+            return None
+        with conn:
+            conn.execute("UPDATE documents SET used = ? WHERE id = ?", (now, best))
+            created, text_blob, result = conn.execute(
+                "SELECT created, text, result FROM documents WHERE id = ?", (best,)
+            ).fetchone()
+        self._count(tool, "hits")
+        return Match(best_score, created, zlib.decompress(text_blob).decode(), result)
+
+    def add_many(self, entries: list[tuple[str, str, str, str]], now: float | None = None):
+        """Store (tool, scope, text, result) entries, then evict down to
+        max_entries. Texts too short to match are left out."""
+        now = time.time() if now is None else now
+        conn = self._conn()
+        stored = 0
+        with conn:
+            for tool, scope, text, result in entries:
+                words = _words(text)
+                if len(words) - SHINGLE_WORDS + 1 < MIN_SHINGLES:
+                    continue
+                sig = _signature(words)
+                doc_id = conn.execute(
+                    "INSERT INTO documents (tool, scope, words, created, used, signature, text, result) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (tool, scope, len(words), now, now, sig.tobytes(),
+                     zlib.compress(text.encode()), result),
+                ).lastrowid
+                conn.executemany(
+                    "INSERT OR IGNORE INTO bands (key, doc) VALUES (?, ?)",
+                    [(key, doc_id) for key in band_keys(tool, scope, sig)],
+                )
+                stored += 1
+            with self._lock:
+                self._entries += stored
+                excess = self._entries - self.max_entries
+            if excess > 0:
+                # Evict a little past the cap so this is not done on every add.
+                victims = conn.execute(
+                    "SELECT id, tool, scope, signature FROM documents ORDER BY used LIMIT ?",
+                    (excess + self.max_entries // 100,),
+                ).fetchall()
+                self._delete(conn, victims)
+
+    def add(self, tool: str, scope: str, text: str, result: str):
+        self.add_many([(tool, scope, text, result)])
+
+    def expire(self, now: float | None = None):
+        """Drop documents older than their tool's TTL."""
+        now = time.time() if now is None else now
+        conn = self._conn()
+        with conn:
+            tools = [row[0] for row in conn.execute("SELECT DISTINCT tool FROM documents")]
+            for tool in tools:
+                victims = conn.execute(
+                    "SELECT id, tool, scope, signature FROM documents WHERE tool = ? AND created < ?",
+                    (tool, now - cache.ttl_for(tool)),
+                ).fetchall()
+                self._delete(conn, victims)
+
+    def _delete(self, conn, victims: list):
+        conn.executemany(
+            "DELETE FROM bands WHERE key = ? AND doc = ?",
+            [
+                (key, doc_id)
+                for doc_id, tool, scope, blob in victims
+                for key in band_keys(tool, scope, array.array("I", blob))
+            ],
+        )
+        conn.executemany("DELETE FROM documents WHERE id = ?", [(row[0],) for row in victims])
+        with self._lock:
+            self._entries -= len(victims)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": self._entries, "tools": {tool: dict(c) for tool, c in self._stats.items()}}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _get_index() -> NearDupIndex:
+    # Opened on first use, so importing the server does not touch the file.
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = NearDupIndex()
+    return _index
+
+
+async def find(tool: str, caller: str | None, options: dict, text: str) -> Match | None:
+    """``caller`` is None when the caller is not known (no identity, or a
+    batch item); nothing is looked up then."""
+    if not NEARDUP_ENABLED or caller is None:
+        return None
+    return await asyncio.to_thread(lambda: _get_index().find(tool, scope_of(caller, options), text))
+
+
+async def remember(tool: str, caller: str | None, options: dict, text: str, result: str):
+    if not NEARDUP_ENABLED or caller is None:
+        return
+    await asyncio.to_thread(_get_index().add, tool, scope_of(caller, options), text, result)
+
+
+def _age(seconds: float) -> str:
+    if seconds < 90:
+        return "just now"
+    if seconds < 90 * 60:
+        return f"{seconds / 60:.0f} minutes ago"
+    return f"{seconds / 3600:.0f} hours ago"
+
+
+def _clip(words: list[str], limit: int = 12) -> str:
+    text = " ".join(words)
+    return text if len(words) <= limit else " ".join(words[:limit]) + " …"
+
+
+def notice(match: Match, text: str, now: float | None = None, max_changes: int = 5) -> str:
+    """Markdown telling the caller the result is for an earlier version, with
+    the words that changed since. Empty if the text is the same. ``match``
+    must come from find() for this caller, as its text is quoted."""
+    old, new = match.text.split(), text.split()
+    if old == new:
+        return ""
+    now = time.time() if now is None else now
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    added = removed = 0
+    changes = []
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            continue
+        removed += i2 - i1
+        added += j2 - j1
+        if len(changes) < max_changes:
+            if op == "replace":
+                changes.append(f"- ~~{_clip(old[i1:i2])}~~ → {_clip(new[j1:j2])}")
+            elif op == "delete":
+                changes.append(f"- removed: ~~{_clip(old[i1:i2])}~~")
+            else:
+                changes.append(f"- added: {_clip(new[j1:j2])}")
+    hidden = sum(1 for op in matcher.get_opcodes() if op[0] != "equal") - len(changes)
+    if hidden > 0:
+        changes.append(f"- … and {hidden} more")
+    return (
+        f"> **Reused result.** This document is {match.similarity:.0%} similar to one analyzed "
+        f"{_age(now - match.created)} with the same options, and the analysis below is for that version. "
+        f"Changes since then (+{added}/−{removed} words):\n>\n"
+        + "\n".join(f"> {line}" for line in changes)
+        + "\n>\n> Call again with `fresh: true` to analyze this version.\n\n"
+    )
+
+
+def stats() -> dict:
+    if _index is None:
+        return {"entries": 0, "tools": {}}
+    return _index.stats()
+
+
+def _collect_metrics():
+    report = stats()
+    yield "honeypot_neardup_entries", "gauge", "Documents held in the near-duplicate index", [({}, report["entries"])]
+    yield "honeypot_neardup_lookups_total", "counter", "Near-duplicate lookups by outcome", [
+        ({"tool": tool, "outcome": outcome}, n)
+        for tool, counts in report["tools"].items()
+        for outcome, n in counts.items()
+    ]
+
+
+metrics.add_collector(_collect_metrics)
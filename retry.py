@@ -0,0 +1,149 @@
+import asyncio
+import random
+import time
+from collections import deque
+
+
+class RetryBudget:
+    """Caps retries and hedges at ``ratio`` of recent calls, plus a small
+    floor of ``min_per_window`` so a quiet server can still retry.
+
+    During an outage every call fails, and without a cap each one would turn
+    into several upstream requests.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_window: int = 10, window: float = 10.0):
+        self.ratio = ratio
+        self.min_per_window = min_per_window
+        self.window = window
+        self._calls = deque()
+        self._extra = deque()
+
+    def _trim(self, now: float):
+        cutoff = now - self.window
+        for log in (self._calls, self._extra):
+            while log and log[0] < cutoff:
+                log.popleft()
+
+    def record_call(self, now: float | None = None):
+        self._calls.append(time.monotonic() if now is None else now)
+
+    def try_spend(self, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        self._trim(now)
+        if len(self._extra) >= self.min_per_window + self.ratio * len(self._calls):
+            return False
+        self._extra.append(now)
+        return True
+
+
+class LatencyTracker:
+    """Recent successful call latencies per key, for hedging delays."""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.size = size
+        self.min_samples = min_samples
+        self._samples = {}
+
+    def record(self, key: str, seconds: float):
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self.size)
+        samples.append(seconds)
+
+    def quantile(self, key: str, q: float) -> float | None:
+        samples = self._samples.get(key)
+        if samples is None or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff for the given 1-based retry number."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class Retrier:
+    """Runs an idempotent coroutine factory with retries and optional hedging.
+
+    ``attempt()`` is called for each try. A failure for which ``retryable``
+    returns True is retried after a jittered backoff, up to ``max_attempts``
+    tries. If ``hedge_after`` seconds pass without an answer, a second try is
+    started alongside the first and whichever succeeds first wins. Retries and
+    hedges both draw on ``budget``.
+    """
+
+    def __init__(
+        self,
+        budget: RetryBudget,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+    ):
+        self.budget = budget
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.budget_exhausted = 0
+
+    def _spend(self) -> bool:
+        if self.budget.try_spend():
+            return True
+        self.budget_exhausted += 1
+        return False
+
+    async def run(self, attempt, retryable, hedge_after: float | None = None):
+        self.budget.record_call()
+        tries = 0
+        while True:
+            tries += 1
+            try:
+                if hedge_after is None:
+                    return await attempt()
+                return await self._hedged(attempt, retryable, hedge_after)
+            except Exception as e:
+                if tries >= self.max_attempts or not retryable(e) or not self._spend():
+                    raise
+            self.retries += 1
+            await asyncio.sleep(backoff_delay(tries, self.base_delay, self.max_delay))
+
+    async def _hedged(self, attempt, retryable, hedge_after: float):
+        primary = asyncio.ensure_future(attempt())
+        pending = {primary}
+        hedged = False
+        try:
+            while True:
+                timeout = hedge_after if not hedged else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    if self._spend():
+                        self.hedges += 1
+                        pending.add(asyncio.ensure_future(attempt()))
+                    continue
+                error = None
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+                # Keep waiting on the other attempt unless this failure is final.
+                if not pending or not retryable(error):
+                    raise error
+                hedged = True
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "budget_exhausted": self.budget_exhausted,
+        }
@@ -0,0 +1,367 @@
+"""Hourly and daily rollups of the calls table, and archival of old raw rows.
+
+Every batch of call records written by analytics also updates one rollup
+row per (granularity, bucket, tool) it touches, in the same transaction.
+Granularities are "hour", "day" and "all" (a single bucket 0). Tool "*"
+aggregates every tool, so the summaries read one row whatever the traffic.
+
+A row holds plain counters, a HyperLogLog sketch of distinct callers and a
+log-bucketed histogram of response times, so percentiles and unique callers
+survive the raw rows being archived. Rows are read-modify-written, which is
+safe because analytics writes under BEGIN IMMEDIATE.
+
+compact() moves raw rows older than the retention window into one gzipped
+JSON-lines file per UTC day and deletes them from the database.
+"""
+import bisect
+import datetime
+import gzip
+import hashlib
+import json
+import math
+import os
+from array import array
+from collections import Counter
+from pathlib import Path
+
+ALL_TOOLS = "*"
+GRANULARITIES = {"hour": 3600, "day": 86400, "all": None}
+# A caller with more calls than this in a day is a repeat caller.
+REPEAT_THRESHOLD = 3
+
+# Positions in a call record, which follows analytics._SQL_INSERT_CALL.
+_TS, _TOOL, _CALLER, _RESPONSE_MS, _SUCCESS, _CHARGED, _PRICE, _UNITS, _UPSTREAM_COST = 0, 1, 2, 4, 5, 6, 7, 9, 13
+CALL_COLUMNS = (
+    "timestamp", "tool_name", "caller_id", "input_size", "response_time_ms", "success", "would_have_charged",
+    "hypothetical_price", "ttfb_ms", "units", "route", "model", "upstream_ms", "upstream_cost",
+)
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS rollups (
+        granularity TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        tool_name TEXT NOT NULL,
+        calls INTEGER NOT NULL DEFAULT 0,
+        successes INTEGER NOT NULL DEFAULT 0,
+        units INTEGER NOT NULL DEFAULT 0,
+        charged_events INTEGER NOT NULL DEFAULT 0,
+        hypothetical_revenue REAL NOT NULL DEFAULT 0.0,
+        upstream_cost REAL NOT NULL DEFAULT 0.0,
+        response_ms_sum INTEGER NOT NULL DEFAULT 0,
+        repeat_callers INTEGER NOT NULL DEFAULT 0,
+        latency BLOB,
+        callers BLOB,
+        PRIMARY KEY (granularity, bucket, tool_name)
+    )
+    """,
+    # Per-caller call counts for the current days, only to spot repeat callers.
+    """
+    CREATE TABLE IF NOT EXISTS daily_callers (
+        day INTEGER NOT NULL,
+        caller_id TEXT NOT NULL,
+        calls INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, caller_id)
+    )
+    """,
+)
+
+
+class HyperLogLog:
+    """Distinct-count sketch: 2**p one-byte registers, about 1.04/sqrt(2**p)
+    relative error (1.6% at the default p=12, in 4 KiB)."""
+
+    __slots__ = ("p", "registers")
+
+    def __init__(self, registers: bytes | None = None, p: int = 12):
+        self.p = p
+        self.registers = bytearray(registers) if registers else bytearray(1 << p)
+        if len(self.registers) != 1 << p:
+            raise ValueError(f"expected {1 << p} registers, got {len(self.registers)}")
+
+    def add(self, value: str):
+        h = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        # bytes.count per rank keeps the sum out of a Python-level loop.
+        total = sum(self.registers.count(rank) * 2.0 ** -rank for rank in range(66 - self.p))
+        estimate = alpha * m * m / total
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+
+class LatencyHistogram:
+    """Response-time counts in fixed log-spaced buckets (10% wide, 1 ms to
+    ~10 min), mergeable by addition; percentiles are accurate to a bucket."""
+
+    BOUNDS = tuple(round(1.1 ** i, 3) for i in range(int(math.log(600_000, 1.1)) + 1))
+    __slots__ = ("counts",)
+
+    def __init__(self, data: bytes | None = None):
+        self.counts = array("I")
+        if data:
+            self.counts.frombytes(data)
+        if len(self.counts) != len(self.BOUNDS) + 1:
+            self.counts = array("I", bytes(4 * (len(self.BOUNDS) + 1)))
+
+    def add(self, ms: float, n: int = 1):
+        self.counts[bisect.bisect_left(self.BOUNDS, ms)] += n
+
+    def merge(self, other: "LatencyHistogram"):
+        for i, n in enumerate(other.counts):
+            if n:
+                self.counts[i] += n
+
+    def quantile(self, q: float) -> float | None:
+        total = sum(self.counts)
+        if not total:
+            return None
+        target = q * total
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return self.BOUNDS[i] if i < len(self.BOUNDS) else self.BOUNDS[-1]
+        return self.BOUNDS[-1]
+
+
+class _Row:
+    __slots__ = ("calls", "successes", "units", "charged_events", "hypothetical_revenue", "upstream_cost",
+                 "response_ms_sum", "repeat_callers", "latency", "callers")
+
+    _SQL_COLUMNS = ("calls, successes, units, charged_events, hypothetical_revenue, upstream_cost, "
+                    "response_ms_sum, repeat_callers, latency, callers")
+
+    def __init__(self, stored: tuple | None = None):
+        if stored is None:
+            stored = (0, 0, 0, 0, 0.0, 0.0, 0, 0, None, None)
+        (self.calls, self.successes, self.units, self.charged_events, self.hypothetical_revenue,
+         self.upstream_cost, self.response_ms_sum, self.repeat_callers, latency, callers) = stored
+        self.latency = LatencyHistogram(latency)
+        self.callers = HyperLogLog(callers)
+
+    def add(self, record: tuple):
+        self.calls += 1
+        self.successes += record[_SUCCESS]
+        self.units += record[_UNITS]
+        self.charged_events += record[_CHARGED]
+        self.hypothetical_revenue += record[_PRICE]
+        self.upstream_cost += record[_UPSTREAM_COST] or 0.0
+        if record[_RESPONSE_MS] is not None:
+            self.response_ms_sum += record[_RESPONSE_MS]
+            self.latency.add(record[_RESPONSE_MS])
+        self.callers.add(record[_CALLER])
+
+    def merge(self, other: "_Row"):
+        for name in ("calls", "successes", "units", "charged_events", "hypothetical_revenue",
+                     "upstream_cost", "response_ms_sum", "repeat_callers"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.latency.merge(other.latency)
+        self.callers.merge(other.callers)
+
+    def values(self) -> tuple:
+        return (self.calls, self.successes, self.units, self.charged_events, self.hypothetical_revenue,
+                self.upstream_cost, self.response_ms_sum, self.repeat_callers,
+                self.latency.counts.tobytes(), bytes(self.callers.registers))
+
+    def summary(self) -> dict:
+        return {
+            "calls": self.calls,
+            "successes": self.successes,
+            "units": self.units,
+            # The estimate can overshoot on small rows; never more than calls.
+            "unique_callers": min(self.callers.count(), self.calls),
+            "repeat_callers": self.repeat_callers,
+            "charged_events": self.charged_events,
+            "hypothetical_revenue": round(self.hypothetical_revenue, 2),
+            "upstream_cost": round(self.upstream_cost, 4),
+            "avg_response_ms": round(self.response_ms_sum / self.calls, 1) if self.calls else 0.0,
+            "p50_response_ms": self.latency.quantile(0.50),
+            "p95_response_ms": self.latency.quantile(0.95),
+            "p99_response_ms": self.latency.quantile(0.99),
+        }
+
+
+def bucket_start(timestamp: float, granularity: str) -> int:
+    width = GRANULARITIES[granularity]
+    return 0 if width is None else int(timestamp // width) * width
+
+
+def _keys(record: tuple):
+    for granularity in GRANULARITIES:
+        bucket = bucket_start(record[_TS], granularity)
+        yield granularity, bucket, ALL_TOOLS
+        if granularity != "all":
+            yield granularity, bucket, record[_TOOL]
+
+
+def _load(conn, key: tuple) -> _Row:
+    stored = conn.execute(
+        f"SELECT {_Row._SQL_COLUMNS} FROM rollups WHERE granularity = ? AND bucket = ? AND tool_name = ?", key,
+    ).fetchone()
+    return _Row(stored)
+
+
+def apply(conn, records: list):
+    """Fold call records into the rollups. Runs inside the caller's write
+    transaction and does not commit."""
+    rows = {}
+    for record in records:
+        for key in _keys(record):
+            row = rows.get(key)
+            if row is None:
+                row = rows[key] = _load(conn, key)
+            row.add(record)
+
+    per_caller = Counter((bucket_start(r[_TS], "day"), r[_CALLER]) for r in records)
+    for (day, caller_id), n in per_caller.items():
+        prior = conn.execute(
+            "SELECT calls FROM daily_callers WHERE day = ? AND caller_id = ?", (day, caller_id),
+        ).fetchone()
+        prior = prior[0] if prior else 0
+        conn.execute(
+            "INSERT OR REPLACE INTO daily_callers (day, caller_id, calls) VALUES (?, ?, ?)",
+            (day, caller_id, prior + n),
+        )
+        if prior <= REPEAT_THRESHOLD < prior + n:
+            key = ("day", day, ALL_TOOLS)
+            row = rows.get(key)
+            if row is None:
+                row = rows[key] = _load(conn, key)
+            row.repeat_callers += 1
+
+    conn.executemany(
+        f"INSERT OR REPLACE INTO rollups (granularity, bucket, tool_name, {_Row._SQL_COLUMNS}) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(*key, *row.values()) for key, row in rows.items()],
+    )
+
+
+def rebuild(conn, chunk: int = 10_000):
+    """Recompute every rollup from the raw calls table (rows already archived
+    are lost to it). Does not commit."""
+    conn.execute("DELETE FROM rollups")
+    conn.execute("DELETE FROM daily_callers")
+    cursor = conn.execute(f"SELECT {', '.join(CALL_COLUMNS)} FROM calls ORDER BY id")
+    while True:
+        records = cursor.fetchmany(chunk)
+        if not records:
+            return
+        apply(conn, records)
+
+
+def read(conn, granularity: str, bucket: int, tool: str = ALL_TOOLS) -> dict:
+    """One rollup row as a summary dict; zeros when nothing was recorded."""
+    return _load(conn, (granularity, bucket, tool)).summary()
+
+
+def report(conn, granularity: str, since: float, until: float, tool: str = ALL_TOOLS) -> dict:
+    """Per-bucket summaries of one tool (or "*") between since and until, and
+    their total with distinct callers and percentiles merged across buckets."""
+    stored = conn.execute(
+        f"SELECT bucket, {_Row._SQL_COLUMNS} FROM rollups "
+        "WHERE granularity = ? AND tool_name = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+        (granularity, tool, bucket_start(since, granularity), until),
+    ).fetchall()
+    total = _Row()
+    buckets = []
+    for bucket, *values in stored:
+        row = _Row(tuple(values))
+        summary = row.summary()
+        # Repeat callers are only counted per day, and only for "*".
+        if granularity != "day" or tool != ALL_TOOLS:
+            del summary["repeat_callers"]
+        buckets.append({"bucket": bucket, "start": _date(bucket) if granularity == "day" else bucket, **summary})
+        total.merge(row)
+    summary = total.summary()
+    del summary["repeat_callers"]
+    return {"granularity": granularity, "tool": tool, "buckets": buckets, "total": summary}
+
+
+def prune(conn, before: float):
+    """Drop hourly rollups and per-caller day counts older than ``before``.
+    Daily and all-time rollups are kept."""
+    conn.execute("DELETE FROM rollups WHERE granularity = 'hour' AND bucket < ?", (bucket_start(before, "hour"),))
+    conn.execute("DELETE FROM daily_callers WHERE day < ?", (bucket_start(before, "day"),))
+
+
+def _write_archive(path: Path, rows: list):
+    # Rows already in an archive from an earlier run cut short (file written,
+    # delete not committed) are written once.
+    existing = {}
+    if path.exists():
+        with gzip.open(path, "rt") as f:
+            for line in f:
+                row = json.loads(line)
+                existing[row["id"]] = row
+    for row in rows:
+        existing[row["id"]] = row
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with gzip.open(tmp, "wt") as f:
+        for row_id in sorted(existing):
+            f.write(json.dumps(existing[row_id], separators=(",", ":")))
+            f.write("\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def compact(conn, archive_dir: Path, before: float) -> dict:
+    """Archive raw calls from whole UTC days before ``before`` to
+    archive_dir/calls-YYYY-MM-DD.jsonl.gz and delete them, one day at a time.
+    The rows are read and the archive written outside any transaction; the
+    write lock is held only for the DELETE, bounded by the last archived id,
+    so writers are not kept waiting on gzip and fsync. ``conn`` must be in
+    autocommit mode (isolation_level=None)."""
+    cutoff = bucket_start(before, "day")
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    columns = ("id", *CALL_COLUMNS)
+    report = {"days": 0, "rows": 0, "files": []}
+    while True:
+        first = conn.execute("SELECT MIN(timestamp) FROM calls WHERE timestamp < ?", (cutoff,)).fetchone()[0]
+        if first is None:
+            break
+        day = bucket_start(first, "day")
+        rows = conn.execute(
+            f"SELECT {', '.join(columns)} FROM calls WHERE timestamp >= ? AND timestamp < ? ORDER BY id",
+            (day, day + 86400),
+        ).fetchall()
+        if not rows:
+            continue
+        path = archive_dir / f"calls-{_date(day)}.jsonl.gz"
+        _write_archive(path, [dict(zip(columns, row)) for row in rows])
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Rows for the day that arrive after the read have higher ids and
+            # stay for the next pass.
+            conn.execute(
+                "DELETE FROM calls WHERE timestamp >= ? AND timestamp < ? AND id <= ?",
+                (day, day + 86400, rows[-1][0]),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        report["days"] += 1
+        report["rows"] += len(rows)
+        report["files"].append(str(path))
+    conn.execute("BEGIN IMMEDIATE")
+    prune(conn, before)
+    conn.execute("COMMIT")
+    return report
+
+
+def _date(day: int) -> str:
+    return datetime.datetime.fromtimestamp(day, datetime.timezone.utc).strftime("%Y-%m-%d")
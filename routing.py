@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+ROUTES_PATH = os.environ.get("GEMINI_ROUTES_PATH", str(Path(__file__).parent / "routes.json"))
+# Seconds a model is skipped after it answers 429/5xx, when its route has another.
+OVERLOAD_COOLDOWN = float(os.environ.get("GEMINI_OVERLOAD_COOLDOWN", "30"))
+
+# Used when no routes file is found: everything on one model, as before routing.
+DEFAULT_CONFIG = {
+    "models": {
+        "gemini-2.0-flash": {"input_per_million": 0.10, "output_per_million": 0.40, "cached_input_per_million": 0.025},
+    },
+    "routes": [],
+    "default": {"name": "default", "models": ["gemini-2.0-flash"]},
+}
+
+
+def _as_set(value) -> frozenset | None:
+    if value is None:
+        return None
+    return frozenset([value] if isinstance(value, str) else value)
+
+
+class Route:
+    """One entry of the routes file: a match on tool, mode and input size,
+    and the models to use for it in order of preference."""
+
+    __slots__ = ("name", "tools", "modes", "min_input_chars", "max_input_chars", "models", "max_latency_ms")
+
+    def __init__(self, spec: dict):
+        self.name = spec["name"]
+        self.tools = _as_set(spec.get("tool"))
+        self.modes = _as_set(spec.get("mode"))
+        self.min_input_chars = spec.get("min_input_chars", 0)
+        self.max_input_chars = spec.get("max_input_chars")
+        self.models = list(spec["models"])
+        self.max_latency_ms = spec.get("max_latency_ms")
+        if not self.models:
+            raise ValueError(f"Route {self.name} has no models")
+
+    def matches(self, tool: str | None, mode: str | None, input_chars: int) -> bool:
+        return (
+            (self.tools is None or tool in self.tools)
+            and (self.modes is None or mode in self.modes)
+            and input_chars >= self.min_input_chars
+            and (self.max_input_chars is None or input_chars <= self.max_input_chars)
+        )
+
+
+class Router:
+    """Picks a route for each request, then a model within it.
+
+    The first route whose match fits wins. Within a route, a model is skipped
+    while it is cooling down after an overload error, or while its recent
+    latency is above the route's max_latency_ms, as long as some later model
+    is usable; otherwise the route's first model is used regardless.
+    """
+
+    def __init__(self, config: dict, cooldown: float = OVERLOAD_COOLDOWN):
+        self.prices = config.get("models", {})
+        self.routes = [Route(spec) for spec in config.get("routes", [])]
+        self.default = Route(config["default"])
+        self.cooldown = cooldown
+        self._cooling = {}
+        # Exponentially weighted upstream latency per model, in seconds.
+        self._latency = {}
+        self._stats = {}
+        for route in [*self.routes, self.default]:
+            unknown = [m for m in route.models if m not in self.prices]
+            if unknown:
+                logger.warning("Route %s uses models without prices: %s", route.name, ", ".join(unknown))
+
+    def route(self, tool: str | None, mode: str | None, input_chars: int) -> Route:
+        for route in self.routes:
+            if route.matches(tool, mode, input_chars):
+                return route
+        return self.default
+
+    def _usable(self, route: Route, model: str, now: float) -> bool:
+        if self._cooling.get(model, 0.0) > now:
+            return False
+        latency = self._latency.get(model)
+        return route.max_latency_ms is None or latency is None or latency * 1000 <= route.max_latency_ms
+
+    def pick(self, route: Route) -> str:
+        now = time.monotonic()
+        for model in route.models:
+            if self._usable(route, model, now):
+                return model
+        return route.models[0]
+
+    def cost(self, model: str, usage) -> float:
+        if usage is None:
+            return 0.0
+        price = self.prices.get(model, {})
+        prompt = usage.prompt_token_count or 0
+        cached = usage.cached_content_token_count or 0
+        output = (usage.candidates_token_count or 0) + (getattr(usage, "thoughts_token_count", None) or 0)
+        return (
+            (prompt - cached) * price.get("input_per_million", 0.0)
+            + cached * price.get("cached_input_per_million", price.get("input_per_million", 0.0))
+            + output * price.get("output_per_million", 0.0)
+        ) / 1_000_000
+
+    def record_success(self, route: Route, model: str, seconds: float, cost: float):
+        previous = self._latency.get(model)
+        self._latency[model] = seconds if previous is None else previous * 0.8 + seconds * 0.2
+        stats = self._stats.setdefault((route.name, model), {"calls": 0, "latency_ms": 0.0, "cost_usd": 0.0, "overloads": 0})
+        stats["calls"] += 1
+        stats["latency_ms"] += seconds * 1000
+        stats["cost_usd"] += cost
+
+    def record_overload(self, route: Route, model: str):
+        self._cooling[model] = time.monotonic() + self.cooldown
+        stats = self._stats.setdefault((route.name, model), {"calls": 0, "latency_ms": 0.0, "cost_usd": 0.0, "overloads": 0})
+        stats["overloads"] += 1
+
+    def stats(self) -> dict:
+        report = {}
+        for (route, model), stats in self._stats.items():
+            calls = stats["calls"]
+            report.setdefault(route, {})[model] = {
+                **stats,
+                "latency_ms": round(stats["latency_ms"], 1),
+                "cost_usd": round(stats["cost_usd"], 6),
+                "avg_latency_ms": round(stats["latency_ms"] / calls, 1) if calls else 0.0,
+            }
+        return report
+
+
+def load_router(path: str = ROUTES_PATH) -> Router:
+    try:
+        with open(path) as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        logger.info("No routes file at %s, sending every call to the default model", path)
+        config = DEFAULT_CONFIG
+    return Router(config)
@@ -0,0 +1,156 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+
+class QueueTimeout(asyncio.TimeoutError):
+    """A request's queue deadline passed before a slot became free."""
+
+
+class AdaptiveScheduler:
+    """Priority queue in front of an AIMD concurrency limit.
+
+    The limit grows by roughly one slot per limit's worth of successful calls
+    made while saturated, and shrinks multiplicatively on an overload error
+    (``backoff``) or on a call much slower than the fastest seen for its tool
+    (``latency_backoff``). At most one decrease applies per round-trip: calls
+    that started before the last decrease do not cut the limit again.
+
+    Waiters are admitted lowest ``priority`` first, FIFO within a priority.
+    """
+
+    def __init__(
+        self,
+        initial: int = 16,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        backoff: float = 0.5,
+        latency_backoff: float = 0.9,
+        latency_tolerance: float = 3.0,
+        is_overload=lambda exc: False,
+        on_wait=None,
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_backoff = latency_backoff
+        self.latency_tolerance = latency_tolerance
+        self.is_overload = is_overload
+        self.on_wait = on_wait
+        self.in_flight = 0
+        self._heap = []
+        self._seq = itertools.count()
+        self._last_decrease = 0.0
+        # Fastest recent latency per tool; drifts slowly upwards so one lucky
+        # call does not make every later one look congested.
+        self._baseline = {}
+        self._queued = defaultdict(int)
+        self._waits = {}
+        self.expired = 0
+        self.overloads = 0
+        self.decreases = 0
+
+    def _wake(self):
+        while self._heap and self.in_flight < int(self.limit):
+            _, _, waiter = heapq.heappop(self._heap)
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def _record_wait(self, tool: str, seconds: float):
+        stats = self._waits.setdefault(tool, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+        if self.on_wait is not None:
+            self.on_wait(tool, seconds)
+
+    async def _acquire(self, tool: str, priority: int, deadline: float | None):
+        queued_at = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), waiter))
+        self._wake()
+        if not waiter.done():
+            self._queued[tool] += 1
+            try:
+                timeout = None if deadline is None else max(0.0, deadline - queued_at)
+                await asyncio.wait({waiter}, timeout=timeout)
+            except BaseException:
+                if waiter.done() and not waiter.cancelled():
+                    self._release()
+                waiter.cancel()
+                raise
+            finally:
+                self._queued[tool] -= 1
+            if not waiter.done():
+                waiter.cancel()
+                self.expired += 1
+                self._record_wait(tool, time.monotonic() - queued_at)
+                raise QueueTimeout(f"{tool} waited {time.monotonic() - queued_at:.1f}s for a Gemini slot")
+        self._record_wait(tool, time.monotonic() - queued_at)
+
+    def _release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _decrease(self, started: float, factor: float):
+        if started < self._last_decrease:
+            return
+        self._last_decrease = time.monotonic()
+        self.limit = max(float(self.min_limit), self.limit * factor)
+        self.decreases += 1
+
+    def _on_success(self, tool: str, started: float, latency: float):
+        baseline = self._baseline.get(tool)
+        if baseline is None or latency < baseline:
+            self._baseline[tool] = latency
+        else:
+            self._baseline[tool] = baseline + (latency - baseline) * 0.01
+            if latency > baseline * self.latency_tolerance:
+                self._decrease(started, self.latency_backoff)
+                return
+        # Only grow while the limit is what holds requests back.
+        if self.in_flight >= int(self.limit) or any(not w.done() for _, _, w in self._heap):
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+
+    @asynccontextmanager
+    async def slot(self, tool: str, priority: int = 0, deadline: float | None = None):
+        """Hold one concurrency slot for the body of the ``async with``.
+
+        ``deadline`` is a time.monotonic() value; QueueTimeout is raised if no
+        slot is free by then.
+        """
+        await self._acquire(tool, priority, deadline)
+        started = time.monotonic()
+        try:
+            yield
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if self.is_overload(e):
+                self.overloads += 1
+                self._decrease(started, self.backoff)
+            raise
+        else:
+            self._on_success(tool, started, time.monotonic() - started)
+        finally:
+            self._release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": {tool: n for tool, n in self._queued.items() if n},
+            "queue_wait_ms": {
+                tool: {"count": n, "avg": round(total / n * 1000, 1), "max": round(peak * 1000, 1)}
+                for tool, (n, total, peak) in self._waits.items()
+            },
+            "expired": self.expired,
+            "overloads": self.overloads,
+            "decreases": self.decreases,
+        }
@@ -0,0 +1,91 @@
+"""Validators for the JSON schemas in prompts, compiled once at import.
+
+Only the subset of JSON Schema used for Gemini's response_schema is
+supported: type, properties, required, items, minItems/maxItems and
+minimum/maximum. Each schema is turned into a tree of closures, so a check
+is a handful of isinstance calls with no schema interpretation per call.
+"""
+import prompts
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+}
+
+
+def _compile(schema: dict):
+    checks = []
+
+    expected = schema.get("type")
+    if expected is not None:
+        python_type = _TYPES[expected]
+
+        def check_type(value, path, errors):
+            # bool is an int subclass but never a valid number here.
+            if not isinstance(value, python_type) or (isinstance(value, bool) and expected != "boolean"):
+                errors.append(f"{path}: expected {expected}, got {type(value).__name__}")
+                return False
+            return True
+    else:
+        def check_type(value, path, errors):
+            return True
+
+    if "minimum" in schema or "maximum" in schema:
+        low, high = schema.get("minimum"), schema.get("maximum")
+
+        def check_range(value, path, errors):
+            if (low is not None and value < low) or (high is not None and value > high):
+                errors.append(f"{path}: {value} is outside {low}-{high}")
+        checks.append(check_range)
+
+    if "properties" in schema or "required" in schema:
+        properties = {name: _compile(sub) for name, sub in schema.get("properties", {}).items()}
+        required = tuple(schema.get("required", ()))
+
+        def check_object(value, path, errors):
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}: missing {name}")
+            for name, check in properties.items():
+                if name in value:
+                    check(value[name], f"{path}.{name}", errors)
+        checks.append(check_object)
+
+    if "items" in schema or "minItems" in schema or "maxItems" in schema:
+        item_check = _compile(schema["items"]) if "items" in schema else None
+        min_items, max_items = schema.get("minItems"), schema.get("maxItems")
+
+        def check_array(value, path, errors):
+            if min_items is not None and len(value) < min_items:
+                errors.append(f"{path}: expected at least {min_items} items, got {len(value)}")
+            if max_items is not None and len(value) > max_items:
+                errors.append(f"{path}: expected at most {max_items} items, got {len(value)}")
+            if item_check is not None:
+                for i, item in enumerate(value):
+                    item_check(item, f"{path}[{i}]", errors)
+        checks.append(check_array)
+
+    def check(value, path, errors):
+        if check_type(value, path, errors):
+            for c in checks:
+                c(value, path, errors)
+    return check
+
+
+def compile_schema(schema: dict):
+    """Return validate(value) -> list of error strings, empty when valid."""
+    check = _compile(schema)
+
+    def validate(value) -> list[str]:
+        errors = []
+        check(value, "$", errors)
+        return errors
+    return validate
+
+
+validate_content_score = compile_schema(prompts.CONTENT_SCORE_SCHEMA)
+validate_measured_score = compile_schema(prompts.CONTENT_SCORE_MEASURED_SCHEMA)
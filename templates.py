@@ -0,0 +1,78 @@
+"""Prompt templates parsed once and rendered as lists of parts.
+
+str.format copies every field value into one new string per prompt, so a
+10k-char document sent to three personas is copied three times, then hashed
+and encoded again as each copy. A Template splits its source into literal
+segments and fields once, at import. parts() returns those same literal
+strings interleaved with the caller's values, so every prompt built from a
+document refers to the one document string.
+
+Routing, the response cache and single-flight keys work on the parts
+without joining them. They are joined once per upstream attempt, just before
+the SDK call (see llm_client._contents).
+"""
+from string import Formatter
+
+
+class Template:
+    """A prompt template with a fixed set of ``{field}`` placeholders.
+
+    Placeholders must be bare names; ``{{`` and ``}}`` are literal braces, as
+    with str.format. The fields found must equal ``fields`` exactly, so a
+    typo in a template fails at import rather than on the first request.
+    """
+
+    __slots__ = ("name", "source", "fields", "_field_set", "_segments")
+
+    def __init__(self, name: str, source: str, fields: tuple[str, ...]):
+        segments = []
+        found = []
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if literal:
+                segments.append((literal, None))
+            if field is None:
+                continue
+            if spec or conversion or not field.isidentifier():
+                raise ValueError(f"{name}: unsupported placeholder {{{field}}}")
+            segments.append((None, field))
+            found.append(field)
+        if set(found) != set(fields):
+            raise ValueError(f"{name}: placeholders {sorted(set(found))} do not match declared fields {sorted(fields)}")
+        self.name = name
+        self.source = source
+        self.fields = tuple(fields)
+        self._field_set = frozenset(fields)
+        self._segments = tuple(segments)
+
+    def parts(self, **values) -> list[str]:
+        """The prompt as a list of strings; joined, they equal str.format's result.
+
+        A list value is spliced in part by part, so templates nest without
+        joining (see the packed score_content_batch prompt).
+        """
+        if values.keys() != self._field_set:
+            missing = self._field_set - values.keys()
+            extra = values.keys() - self._field_set
+            raise TypeError(f"{self.name}: missing fields {sorted(missing)}, unexpected {sorted(extra)}")
+        out = []
+        for literal, field in self._segments:
+            if field is None:
+                out.append(literal)
+                continue
+            value = values[field]
+            if isinstance(value, list):
+                out.extend(value)
+            else:
+                out.append(value if isinstance(value, str) else str(value))
+        return out
+
+    def text(self, **values) -> str:
+        return "".join(self.parts(**values))
+
+    def __repr__(self):
+        return f"Template({self.name!r}, fields={self.fields!r})"
+
+
+def prompt_length(prompt: str | list[str]) -> int:
+    """Characters in a prompt given as text or as parts."""
+    return len(prompt) if isinstance(prompt, str) else sum(map(len, prompt))
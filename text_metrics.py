@@ -0,0 +1,233 @@
+"""Measurable properties of a text, and scores for the dimensions they settle.
+
+Readability, structure and SEO potential follow from counts: sentence and
+paragraph lengths, syllables, headings, keyword use. ``analyze`` leaves the
+per-character and per-word work to the regex engine: paragraphs, markers and
+sentences are split in C, words found with one findall per sentence, and
+Python only loops once per sentence. Syllables and keyword counts come from a
+Counter, once per distinct word rather than per occurrence.
+
+score_content's fast mode returns these scores alone; its standard mode
+gives them to the model with the metrics, and asks it only for clarity,
+persuasiveness and originality.
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+from itertools import islice
+
+_LINK = re.compile(r"\[([^\]\n]*)\]\([^)\s]*\)|https?://\S+")
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+# A heading or list marker at the start of a line; split() keeps the marker.
+_MARKER = re.compile(r"^ {0,3}(#{1,6}|[-*+]|\d{1,9}[.)])[ \t]+(?=\S)", re.MULTILINE)
+_SENTENCE_END = re.compile(r"[.!?]+(?=[\s\"'’”)]|$)")
+_WORD = re.compile(r"\w+(?:['’]\w+|[.,]\d+)*")
+_VOWEL_GROUPS = re.compile(r"[aeiouy]+")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her here
+hers herself him himself his how i if in into is it its itself just let me more most my myself no nor not now of
+off on once only or other our ours ourselves out over own same she should so some such than that the their
+theirs them themselves then there these they this those through to too under until up very was we were what when
+where which while who whom why will with would you your yours yourself yourselves
+""".split())
+
+# Sentences longer than this many words count as long.
+LONG_SENTENCE_WORDS = 25
+# Expected length in words by content type; anything else uses DEFAULT_WORDS.
+TARGET_WORDS = {
+    "ad": (5, 80),
+    "email": (50, 300),
+    "landing page": (300, 1500),
+    "blog post": (600, 2500),
+    "article": (600, 3000),
+    "documentation": (200, 5000),
+    "pitch deck": (100, 1500),
+}
+DEFAULT_WORDS = (300, 3000)
+# Below this many words the counts say nothing; the scores are floored.
+MIN_WORDS = 20
+MEASURED_DIMENSIONS = ("readability", "structure", "seo_potential")
+
+
+@lru_cache(maxsize=65536)
+def syllables(word: str) -> int:
+    """Syllables in a lowercase English word, by vowel groups."""
+    count = len(_VOWEL_GROUPS.findall(word))
+    if count > 1 and word.endswith("e") and not word.endswith(("le", "ee", "ye")):
+        count -= 1
+    return max(count, 1)
+
+
+def _percentile(sorted_values: list[int], fraction: float) -> int:
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def analyze(text: str, opening_words: int = 100) -> dict:
+    """Counts and ratios for ``text``, as a JSON-ready dict."""
+    text, links = _LINK.subn(r"\1", text.lower())
+    words = []  # body words, in order
+    heading_words = set()
+    sentence_lengths, paragraph_lengths = [], []
+    headings = items = 0
+
+    # Tokenizing is regex work in C; Python only loops per sentence.
+    for block in _PARAGRAPH_BREAK.split(text):
+        parts = _MARKER.split(block)
+        paragraph = 0
+        for marker, segment in ((None, parts[0]), *zip(parts[1::2], parts[2::2])):
+            if marker is not None and marker[0] == "#":
+                # A heading ends its line, and the paragraph before it.
+                headings += 1
+                heading, _, segment = segment.partition("\n")
+                heading_words.update(_WORD.findall(heading))
+                if paragraph:
+                    paragraph_lengths.append(paragraph)
+                    paragraph = 0
+            elif marker is not None:
+                items += 1
+            for sentence in _SENTENCE_END.split(segment):
+                found = _WORD.findall(sentence)
+                if found:
+                    words += found
+                    sentence_lengths.append(len(found))
+                    paragraph += len(found)
+        if paragraph:
+            paragraph_lengths.append(paragraph)
+
+    word_count = len(words)
+    counts = Counter(words)
+    syllable_count = sum(syllables(word) * n for word, n in counts.items())
+    sentence_count = max(len(sentence_lengths), 1)
+    per_word = syllable_count / word_count if word_count else 0.0
+    per_sentence = word_count / sentence_count
+    sentence_lengths.sort()
+
+    keywords = list(islice(
+        ((word, n) for word, n in counts.most_common()
+         if word not in STOPWORDS and len(word) > 2 and word.isalpha()),
+        5,
+    ))
+    opening = set(words[:opening_words])
+    return {
+        "words": word_count,
+        "sentences": len(sentence_lengths),
+        "paragraphs": len(paragraph_lengths),
+        "headings": headings,
+        "list_items": items,
+        "links": links,
+        "avg_sentence_words": round(per_sentence, 1),
+        "p90_sentence_words": _percentile(sentence_lengths, 0.9),
+        "long_sentence_share": round(
+            sum(1 for n in sentence_lengths if n > LONG_SENTENCE_WORDS) / sentence_count, 3,
+        ),
+        "avg_paragraph_words": round(word_count / max(len(paragraph_lengths), 1), 1),
+        "max_paragraph_words": max(paragraph_lengths, default=0),
+        "syllables_per_word": round(per_word, 2),
+        "flesch_reading_ease": round(206.835 - 1.015 * per_sentence - 84.6 * per_word, 1) if word_count else 0.0,
+        "flesch_kincaid_grade": round(0.39 * per_sentence + 11.8 * per_word - 15.59, 1) if word_count else 0.0,
+        "distinct_word_share": round(len(counts) / word_count, 3) if word_count else 0.0,
+        "keywords": [
+            {"word": word, "count": n, "density": round(100 * n / word_count, 2)} for word, n in keywords
+        ],
+        "keyword_in_headings": bool(keywords) and keywords[0][0] in heading_words,
+        "keyword_in_opening": bool(keywords) and keywords[0][0] in opening,
+    }
+
+
+def _clamp(value: float) -> int:
+    return int(min(10, max(1, round(value))))
+
+
+def _readability(m: dict) -> tuple[int, list[tuple[float, str]]]:
+    penalties = []
+    grade = m["flesch_kincaid_grade"]
+    if grade > 8:
+        penalties.append((0.8 * (grade - 8), f"Bring the reading level down from grade {grade:g}: use shorter words and split long sentences."))
+    if m["long_sentence_share"] > 0.1:
+        penalties.append((
+            4 * (m["long_sentence_share"] - 0.1),
+            f"{m['long_sentence_share']:.0%} of sentences run over {LONG_SENTENCE_WORDS} words; split them.",
+        ))
+    if m["p90_sentence_words"] > 35:
+        penalties.append((1, f"The longest sentences reach {m['p90_sentence_words']} words; cap them near 25."))
+    return _clamp(10 - sum(p for p, _ in penalties)), penalties
+
+
+def _structure(m: dict) -> tuple[int, list[tuple[float, str]]]:
+    penalties = []
+    words = m["words"]
+    if words >= 300 and not m["headings"]:
+        penalties.append((3, "Add headings so readers can scan the piece; there are none."))
+    elif m["headings"] and words / m["headings"] > 350:
+        penalties.append((2, f"Add headings: there is one per {words // m['headings']} words, aim for one per 200-300."))
+    if m["max_paragraph_words"] > 150:
+        penalties.append((2, f"Break up the longest paragraph ({m['max_paragraph_words']} words)."))
+    elif m["avg_paragraph_words"] > 100:
+        penalties.append((1, f"Paragraphs average {m['avg_paragraph_words']:g} words; keep them under 100."))
+    if words > 600 and not m["list_items"]:
+        penalties.append((1, "Use a list for steps, options or key points."))
+    return _clamp(10 - sum(p for p, _ in penalties)), penalties
+
+
+def _seo(m: dict, content_type: str) -> tuple[int, list[tuple[float, str]]]:
+    penalties = []
+    words = m["words"]
+    low, high = TARGET_WORDS.get(content_type.strip().lower(), DEFAULT_WORDS)
+    if words < low:
+        penalties.append((4 * (1 - words / low), f"At {words} words this is short for {content_type} content; aim for {low}+."))
+    elif words > high:
+        penalties.append((1, f"At {words} words this is long for {content_type} content; consider splitting it."))
+    if m["keywords"] and words >= 150:
+        top = m["keywords"][0]
+        if top["density"] < 0.5 or top["density"] > 3:
+            penalties.append((2, f"The main keyword \"{top['word']}\" is {top['density']:g}% of words; 0.5-3% reads naturally."))
+        if m["headings"] and not m["keyword_in_headings"]:
+            penalties.append((1, f"Put the main keyword \"{top['word']}\" in a heading."))
+        if not m["keyword_in_opening"]:
+            penalties.append((1, f"Mention the main keyword \"{top['word']}\" in the opening."))
+    if words >= 300:
+        if not m["headings"]:
+            penalties.append((2, "Headings help search engines as much as readers; add some."))
+        if not m["links"]:
+            penalties.append((1, "Link to related pages or sources."))
+    return _clamp(10 - sum(p for p, _ in penalties)), penalties
+
+
+def assessable(m: dict) -> bool:
+    """Whether ``m`` has enough words for its scores to mean anything."""
+    return m["words"] >= MIN_WORDS
+
+
+def score(m: dict, content_type: str) -> tuple[dict, list[str]]:
+    """Scores (1-10) for the measured dimensions, and the improvements that
+    would gain the most, largest first. Text too short to assess scores 1."""
+    if not assessable(m):
+        return dict.fromkeys(MEASURED_DIMENSIONS, 1), [
+            f"Too short to assess: {m['words']} word{'' if m['words'] == 1 else 's'}; readability, structure and SEO "
+            f"need at least {MIN_WORDS}."
+        ]
+    readability, r = _readability(m)
+    structure, s = _structure(m)
+    seo, e = _seo(m, content_type)
+    improvements = [text for _, text in sorted(r + s + e, key=lambda p: -p[0])]
+    return {"readability": readability, "structure": structure, "seo_potential": seo}, improvements
+
+
+def brief(m: dict, scores: dict) -> str:
+    """The measured scores and their metrics as short lines for a prompt."""
+    keywords = ", ".join(f"{k['word']} ({k['density']:g}%)" for k in m["keywords"]) or "none"
+    return "\n".join((
+        f"Readability: {scores['readability']}/10; structure: {scores['structure']}/10; "
+        f"SEO potential: {scores['seo_potential']}/10",
+        f"Words: {m['words']}; sentences: {m['sentences']}; paragraphs: {m['paragraphs']}; "
+        f"headings: {m['headings']}; list items: {m['list_items']}; links: {m['links']}",
+        f"Sentence length: average {m['avg_sentence_words']:g} words, 90th percentile {m['p90_sentence_words']}, "
+        f"{m['long_sentence_share']:.0%} over {LONG_SENTENCE_WORDS} words",
+        f"Paragraph length: average {m['avg_paragraph_words']:g} words, longest {m['max_paragraph_words']}",
+        f"Flesch reading ease {m['flesch_reading_ease']:g}; Flesch-Kincaid grade {m['flesch_kincaid_grade']:g}",
+        f"Top keywords: {keywords}",
+    ))